@@ -0,0 +1,149 @@
+"""
+Reading uploaded audio into samples.
+
+The container is recognised from its first bytes instead of the declared
+content type. Everything libsndfile understands is read by soundfile
+directly; only what it lacks (MP3, WebM, MP4 and unknown formats) is decoded
+by a single ffmpeg subprocess. Samples are returned as mono float32, and
+files longer than an optional limit are refused without decoding more than
+the limit.
+"""
+
+import io
+import subprocess
+from typing import BinaryIO, Optional, Tuple, Union
+
+import numpy as np
+import soundfile as sf
+from pydub import AudioSegment
+
+# Number of leading bytes sniff_audio_format() looks at
+SNIFF_BYTES = 12
+
+# Containers read by libsndfile; the names are those of sf.available_formats()
+_LIBSNDFILE_FORMATS = {"WAV", "RF64", "W64", "FLAC", "OGG", "AIFF", "AU", "CAF"}
+
+# ffmpeg decodes this far past a duration limit, so audio that is exactly
+# as long as the limit can be told from audio that is longer
+_LIMIT_MARGIN_SECONDS = 1.0
+
+
+def sniff_audio_format(header: bytes) -> Optional[str]:
+    """
+    Identifies the audio container from the first SNIFF_BYTES bytes of a
+    file. Returns None if it is not recognised.
+    """
+    if header[:4] in (b"RIFF", b"RIFX") and header[8:12] == b"WAVE":
+        return "WAV"
+    if header[:4] == b"RF64":
+        return "RF64"
+    if header[:4] == b"riff":
+        return "W64"
+    if header[:4] == b"fLaC":
+        return "FLAC"
+    if header[:4] == b"OggS":
+        return "OGG"
+    if header[:4] == b"FORM" and header[8:12] in (b"AIFF", b"AIFC"):
+        return "AIFF"
+    if header[:4] == b".snd":
+        return "AU"
+    if header[:4] == b"caff":
+        return "CAF"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "WEBM"
+    if header[4:8] == b"ftyp":
+        return "MP4"
+    # ID3 tag, or the sync word of a bare MPEG audio frame
+    if header[:3] == b"ID3" or (
+        len(header) >= 2 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0
+    ):
+        return "MP3"
+    return None
+
+
+class AudioTooLong(ValueError):
+    """Raised when an audio file is longer than the allowed duration."""
+
+
+def _check_duration(seconds: float, max_seconds: Optional[float]) -> None:
+    if max_seconds is not None and seconds > max_seconds:
+        raise AudioTooLong(
+            f"Audio is {seconds:.0f} s long, the maximum is {max_seconds:.0f} s"
+        )
+
+
+def _to_mono(samples: np.ndarray) -> np.ndarray:
+    if samples.ndim == 2:
+        return samples.mean(axis=1, dtype=np.float32)
+    return samples
+
+
+def _read_with_libsndfile(
+    source: Union[str, BinaryIO], max_seconds: Optional[float]
+) -> Tuple[np.ndarray, int]:
+    with sf.SoundFile(source) as audio_file:
+        _check_duration(audio_file.frames / audio_file.samplerate, max_seconds)
+        samples = audio_file.read(dtype="float32")
+        return _to_mono(samples), audio_file.samplerate
+
+
+def _read_with_ffmpeg(
+    source: Union[bytes, str], max_seconds: Optional[float]
+) -> Tuple[np.ndarray, int]:
+    """
+    Decodes any format ffmpeg knows in one run, without probing it first:
+    streamed WebM recordings do not state a duration anyway. With a limit,
+    ffmpeg stops shortly after max_seconds, so a long file is neither
+    decoded completely nor held in memory.
+    """
+    # AudioSegment.converter is ffmpeg as found (or configured) for pydub
+    command = [AudioSegment.converter, "-nostdin", "-v", "error"]
+    if isinstance(source, bytes):
+        # The cache protocol lets ffmpeg seek in piped input, e.g. in MP4s
+        # whose index comes last
+        command += ["-read_ahead_limit", "-1", "-i", "cache:pipe:0"]
+    else:
+        command += ["-i", source]
+    command += ["-vn", "-acodec", "pcm_f32le", "-f", "wav"]
+    if max_seconds is not None:
+        command += ["-t", str(max_seconds + _LIMIT_MARGIN_SECONDS)]
+    command.append("pipe:1")
+    result = subprocess.run(
+        command,
+        input=source if isinstance(source, bytes) else None,
+        capture_output=True,
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise ValueError(
+            "ffmpeg could not decode the audio: "
+            + result.stderr.decode(errors="ignore").strip()
+        )
+    # The chunk sizes of a WAV written to a pipe are left unset, and
+    # libsndfile then reads up to the end of the data
+    return _read_with_libsndfile(io.BytesIO(result.stdout), max_seconds)
+
+
+def _as_file(source: Union[bytes, str]) -> Union[str, BinaryIO]:
+    return io.BytesIO(source) if isinstance(source, bytes) else source
+
+
+def read_audio(
+    source: Union[bytes, str], max_seconds: Optional[float] = None
+) -> Tuple[np.ndarray, int]:
+    """
+    Returns (mono float32 samples, sample rate) of an audio file, given as
+    its contents or as a path. Raises AudioTooLong, without decoding much
+    more than max_seconds of it, if it lasts longer than that.
+    """
+    if isinstance(source, bytes):
+        header = source[:SNIFF_BYTES]
+    else:
+        with open(source, "rb") as f:
+            header = f.read(SNIFF_BYTES)
+    if sniff_audio_format(header) in _LIBSNDFILE_FORMATS:
+        try:
+            return _read_with_libsndfile(_as_file(source), max_seconds)
+        except sf.LibsndfileError:
+            # E.g. an Ogg codec this libsndfile build lacks: let ffmpeg try
+            pass
+    return _read_with_ffmpeg(source, max_seconds)
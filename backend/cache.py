@@ -0,0 +1,221 @@
+"""
+Caches of decode results and of generated signals.
+
+Decode results are keyed by a hash of the decoded samples.
+
+Clients that time out tend to resubmit exactly the same recording, and the
+multi-mode decode is by far the most expensive part of handling it. The
+cache keeps recent results in a bounded in-memory LRU and, optionally, in a
+directory shared by all worker processes, so a retry that lands on another
+worker is still a hit. Entries can expire after a time to live.
+
+Generated signals are deterministic, so popular messages are kept as
+finished files.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, MutableSequence, Optional
+
+import numpy as np
+
+_HITS, _MISSES = 0, 1
+
+
+def _modified_at(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0  # Removed meanwhile; sorts first and is skipped
+
+
+class DecodeCache:
+    """
+    Bounded LRU cache of JSON-serializable values with an optional time to
+    live (seconds) and an optional on-disk tier holding up to
+    `max_disk_entries` files in `disk_dir`. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: Optional[float] = None,
+        disk_dir: Optional[str] = None,
+        max_disk_entries: int = 0,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # [hits, misses]; may be replaced by shared memory, see share_counts()
+        self._counts: MutableSequence[int] = [0, 0]
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def key(samples: np.ndarray, mode: str) -> str:
+        """Key of the result of decoding `samples` with `mode` as first guess."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{mode}\0{samples.dtype.str}\0".encode())
+        digest.update(np.ascontiguousarray(samples).view(np.uint8))
+        return digest.hexdigest()
+
+    @property
+    def hits(self) -> int:
+        return self._counts[_HITS]
+
+    @property
+    def misses(self) -> int:
+        return self._counts[_MISSES]
+
+    def share_counts(self, counts: MutableSequence[int]) -> None:
+        """
+        Counts hits and misses in `counts` from now on, e.g. a
+        multiprocessing.Array shared by all workers using a cache.
+        """
+        self._counts = counts
+
+    def _count(self, index: int) -> None:
+        # A multiprocessing.Array brings its own lock, a plain list does not
+        lock = getattr(self._counts, "get_lock", lambda: self._lock)()
+        with lock:
+            self._counts[index] += 1
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._store(key, entry)
+        if entry is None:
+            self._count(_MISSES)
+            return None
+        self._count(_HITS)
+        return entry[1]
+
+    def put(self, key: str, value: Any) -> None:
+        entry = (time.time(), value)
+        self._store(key, entry)
+        self._write_disk(key, entry)
+
+    def _store(self, key: str, entry: tuple) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable decode cache entry {path}: {e}")
+            return None
+        try:
+            stored_at, value = float(stored["stored_at"]), stored["value"]
+        except (KeyError, TypeError, ValueError) as e:
+            # Valid JSON, but not an entry written by _write_disk
+            logging.warning(f"Ignoring malformed decode cache entry {path}: {e!r}")
+            return None
+        if self._expired(stored_at):
+            return None
+        return stored_at, tuple(value) if isinstance(value, list) else value
+
+    def _write_disk(self, key: str, entry: tuple) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        # Written under a temporary name and renamed, so that other processes
+        # never read a partial file
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump({"stored_at": entry[0], "value": entry[1]}, f)
+            os.replace(temp_path, path)
+            self._prune_disk()
+        except OSError as e:
+            # A full or unwritable disk only costs the shared tier; the entry
+            # is still cached in memory
+            logging.warning(f"Could not write decode cache entry {path}: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass  # Never created, or already renamed
+
+    def _prune_disk(self) -> None:
+        paths = [
+            os.path.join(self.disk_dir, name)
+            for name in os.listdir(self.disk_dir)
+            if name.endswith(".json")
+        ]
+        if len(paths) <= self.max_disk_entries:
+            return
+        paths.sort(key=_modified_at)
+        for path in paths[: len(paths) - self.max_disk_entries]:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass  # Already removed by another worker
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class GeneratedSignalCache:
+    """
+    In-memory LRU of generated audio files, bounded by their total size.
+    Thread-safe.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """Returns the file contents, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, data: bytes) -> None:
+        """Caches data, unless it alone exceeds max_bytes."""
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
@@ -2,8 +2,10 @@
 Centralized configuration file for the SpectraChirp Acoustic Modem.
 """
 
+import os
 from dataclasses import dataclass
 from reedsolo import RSCodec
+from .reed_solomon import BatchRSCodec
 
 # --- Global Audio Configuration ---
 SAMPLE_RATE = 16000
@@ -19,22 +21,116 @@ MIN_CORRELATION_THRESHOLD = (
 SYNC_CORRELATION_THRESHOLD_FACTOR = (
     0.5  # Factor to determine the peak detection threshold from the max correlation
 )
+STREAM_SYNC_MIN_PEAK_RATIO = (
+    12  # Chirp peak / correlation std required by the incremental (live) decoder
+)
+MODE_PROBE_PACKETS = (
+    2  # Packets decoded per candidate mode before committing to a full decode
+)
 PACKET_PAYLOAD_SIZE = 32  # Size of the data payload in bytes
 PACKET_HEADER_SIZE = 4  # Size of the packet header in bytes
 PACKET_CRC_SIZE = 4  # Size of the CRC checksum in bytes
+MAX_PACKETS = 0xFFFF  # Packet number and count are 2-byte header fields
+PACKET_PAUSE_DURATION = 0.1  # Silence after each packet in seconds
+
+# --- Demodulation Configuration ---
+# Correlator used by the receiver: "bank" (precomputed reference matrices),
+# "fwht" (per-chip projection + fast Walsh-Hadamard transform) or
+# "reference" (original per-symbol loop, kept for verification)
+DEMOD_ENGINE = "bank"
+# Number of modem configurations whose precomputed DSP tables (Hadamard
+# matrix, reference banks, symbol tables, chirps) are kept in memory
+DSP_CACHE_SIZE = 16
+# Long recordings are decoded in overlapping windows of this many seconds
+# (at least two packets long) instead of being loaded in full
+BLOCK_DECODE_SECONDS = 60
+# Recordings longer than this (in seconds) are decoded block-wise by the CLI
+BLOCK_DECODE_MIN_SECONDS = 600
+
+# --- Live Audio Configuration ---
+LIVE_BLOCK_SIZE = 1600  # Samples per audio device callback (0.1 s)
+# Capacity of the ring buffer between the audio callback and the decoder
+# thread; if the decoder falls further behind, the oldest samples are dropped
+LIVE_BUFFER_SECONDS = 30
+# Packets the live transmitter may modulate ahead of the one being played
+LIVE_TX_QUEUE_PACKETS = 4
 
 # --- Forward Error Correction (FEC) Configuration ---
 # Reed-Solomon error correction settings
 RS_NSYMS = 16  # Number of ECC symbols to add
 RSC = RSCodec(RS_NSYMS)
+# Vectorized codec for whole batches of packets, byte-compatible with RSC
+RSC_BATCH = BatchRSCodec(RS_NSYMS)
+
+# --- Server Configuration ---
+# Worker processes that run decode/generate requests off the event loop
+DSP_WORKERS = int(os.environ.get("SPECTRACHIRP_DSP_WORKERS", 2))
+# Jobs (running + queued) accepted before the API answers 503
+DSP_MAX_PENDING_JOBS = int(os.environ.get("SPECTRACHIRP_DSP_MAX_PENDING", 8))
+# Retry-After value (seconds) sent with a 503 when the DSP queue is full
+DSP_RETRY_AFTER = 5
+# Texts of at least this many UTF-8 bytes are streamed packet by packet by
+# /generate_signal instead of being rendered in full first
+STREAMING_TEXT_THRESHOLD = 1024
+# Total size of the generated files /generate_signal keeps in memory, so
+# that repeated requests for the same message are served without DSP
+GENERATED_SIGNAL_CACHE_BYTES = int(
+    os.environ.get("SPECTRACHIRP_GENERATED_CACHE_BYTES", 64 * 1024 * 1024)
+)
+# Part of the ETags of generated files; bump it whenever the modulation or
+# the file encoding changes the bytes generated for a message
+GENERATED_SIGNAL_VERSION = 1
+# Uploads to /decode_signal: larger request bodies are refused with a 413
+# before they are parsed, and files longer than the maximum duration before
+# any DSP starts. The samples are decoded as mono float32, so a worker holds
+# at most about UPLOAD_MAX_SECONDS * sample rate * 4 bytes of audio.
+UPLOAD_MAX_BYTES = int(
+    os.environ.get("SPECTRACHIRP_UPLOAD_MAX_BYTES", 50 * 1024 * 1024)
+)
+UPLOAD_MAX_SECONDS = float(os.environ.get("SPECTRACHIRP_UPLOAD_MAX_SECONDS", 600))
+# Results of /decode_signal are cached by a hash of the decoded samples and
+# the requested mode: up to DECODE_CACHE_ENTRIES per worker in memory, and,
+# if SPECTRACHIRP_DECODE_CACHE_DIR is set, up to DECODE_CACHE_DISK_ENTRIES
+# in that directory, shared by all workers. Entries expire after
+# DECODE_CACHE_TTL seconds.
+DECODE_CACHE_ENTRIES = int(os.environ.get("SPECTRACHIRP_DECODE_CACHE_ENTRIES", 256))
+DECODE_CACHE_TTL = float(os.environ.get("SPECTRACHIRP_DECODE_CACHE_TTL", 3600))
+DECODE_CACHE_DIR = os.environ.get("SPECTRACHIRP_DECODE_CACHE_DIR") or None
+DECODE_CACHE_DISK_ENTRIES = 10000
+# Largest binary frame /ws/decode accepts, in float32 samples (1 s); clients
+# send small frames as audio is captured
+WS_MAX_FRAME_SAMPLES = SAMPLE_RATE
+
+
+# --- Output File Formats ---
+@dataclass(frozen=True)
+class AudioFormat:
+    """A file format generated signals can be written in."""
+
+    media_type: str
+    subtype: str  # libsndfile sample encoding
+    extension: str
+
+
+# The format names are those of soundfile. Vorbis is lossy, but the tones
+# survive it and the files are several times smaller than WAV; FLAC is
+# lossless and decodes to exactly the WAV samples.
+AUDIO_FORMATS = {
+    "WAV": AudioFormat("audio/wav", "PCM_16", "wav"),
+    "FLAC": AudioFormat("audio/flac", "PCM_16", "flac"),
+    "OGG": AudioFormat("audio/ogg", "VORBIS", "ogg"),
+}
 
 
 # --- Modem Mode Definitions ---
 
 
-@dataclass
+@dataclass(frozen=True)
 class ModemConfig:
-    """A data class to hold the configuration for a specific modem mode."""
+    """
+    A data class to hold the configuration for a specific modem mode.
+    Frozen so it is hashable and can key the DSP artifact cache.
+    """
 
     name: str
     num_tones: int
@@ -42,6 +138,11 @@ class ModemConfig:
     tone_spacing: float
     samples_per_symbol: int
     bits_per_symbol: int
+    # Preamble chirp sweep. Each built-in mode uses its own sweep so the
+    # receiver can tell the mode from the preamble; the default is the legacy
+    # chirp, which carries no mode information.
+    chirp_f0: float = PACKET_CHIRP_F0
+    chirp_f1: float = PACKET_CHIRP_F1
 
 
 # Dictionary mapping mode names to their configurations
@@ -53,6 +154,8 @@ MODEM_MODES = {
         tone_spacing=35,
         samples_per_symbol=int(SAMPLE_RATE * (40 / 1000.0)),
         bits_per_symbol=5,  # log2(32)
+        chirp_f0=3500,  # Down-sweep over the legacy band
+        chirp_f1=2500,
     ),
     "ROBUST": ModemConfig(
         name="ROBUST",
@@ -61,6 +164,8 @@ MODEM_MODES = {
         tone_spacing=25,
         samples_per_symbol=int(SAMPLE_RATE * (60 / 1000.0)),
         bits_per_symbol=4,  # log2(16)
+        chirp_f0=3500,  # Up-sweep above the legacy band
+        chirp_f1=4500,
     ),
     "FAST": ModemConfig(
         name="FAST",
@@ -69,5 +174,7 @@ MODEM_MODES = {
         tone_spacing=50,
         samples_per_symbol=int(SAMPLE_RATE * (20 / 1000.0)),
         bits_per_symbol=5,  # log2(32)
+        chirp_f0=4500,  # Down-sweep above the legacy band
+        chirp_f1=3500,
     ),
 }
@@ -0,0 +1,244 @@
+"""
+Process pool for the CPU-heavy work behind the API endpoints.
+
+Decoding and signal generation run in worker processes so a long upload
+cannot stall the event loop. Every worker precomputes the DSP tables of the
+built-in modes when it starts, and the number of jobs that may be running or
+waiting is bounded: once it is reached, further jobs are refused with
+DSPQueueFull instead of piling up. A worker that dies (e.g. killed for
+running out of memory) breaks the whole pool; the pool is then replaced and
+only the jobs that were running fail, with DSPWorkerLost. Decode results are cached per worker (and
+optionally on disk), with hit and miss counts shared by all workers.
+"""
+
+import asyncio
+import contextlib
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator, Optional, Tuple, Union
+
+from .audio_io import read_audio
+from .cache import DecodeCache
+from .config import (
+    DECODE_CACHE_DIR,
+    DECODE_CACHE_DISK_ENTRIES,
+    DECODE_CACHE_ENTRIES,
+    DECODE_CACHE_TTL,
+    DSP_MAX_PENDING_JOBS,
+    DSP_WORKERS,
+    UPLOAD_MAX_SECONDS,
+)
+from .modem_mfsk import (
+    receive_text_mfsk,
+    send_text_mfsk,
+    warm_dsp_caches,
+    write_text_mfsk,
+)
+
+# Decode results of this process, see DecodeCache
+decode_cache = DecodeCache(
+    DECODE_CACHE_ENTRIES,
+    ttl=DECODE_CACHE_TTL,
+    disk_dir=DECODE_CACHE_DIR,
+    max_disk_entries=DECODE_CACHE_DISK_ENTRIES,
+)
+
+
+class DSPQueueFull(RuntimeError):
+    """Raised when the executor already holds its maximum of pending jobs."""
+
+
+class DSPWorkerLost(RuntimeError):
+    """Raised for a job whose worker process died before it finished."""
+
+
+def generate_audio(text: str, mode: str, audio_format: str = "WAV") -> bytes:
+    """Worker job: modulates text and returns the contents of the audio file."""
+    return send_text_mfsk(text, mode=mode, audio_format=audio_format).read()
+
+
+def generate_audio_file(text: str, mode: str, audio_format: str, path: str) -> None:
+    """
+    Worker job: writes the audio file of text to path, packet by packet, for
+    texts whose file should not be held in memory.
+    """
+    write_text_mfsk(text, path, mode=mode, audio_format=audio_format)
+
+
+def decode_audio(source: Union[bytes, str], mode: str = "DEFAULT") -> Tuple[str, str]:
+    """
+    Worker job: decodes an uploaded audio file of any supported format, given
+    as its contents or a path to it, trying `mode` first.
+    Returns (decoded text, detected mode); raises AudioTooLong for files over
+    UPLOAD_MAX_SECONDS. Repeated uploads of the same audio are answered from
+    decode_cache.
+    """
+    audio_data, _ = read_audio(source, max_seconds=UPLOAD_MAX_SECONDS)
+    key = DecodeCache.key(audio_data, mode)
+    result = decode_cache.get(key)
+    if result is None:
+        decoded_text, _, _, detected_mode = receive_text_mfsk(audio_data, mode)
+        result = decoded_text, detected_mode
+        decode_cache.put(key, result)
+    return result
+
+
+def _init_worker(cache_counts) -> None:
+    warm_dsp_caches()
+    decode_cache.share_counts(cache_counts)
+
+
+class _PendingStream:
+    """
+    Iterator over a streamed job that frees its executor slot once it is
+    exhausted, fails, or is closed or discarded without being consumed.
+    """
+
+    def __init__(self, iterator: Iterator, release: Callable[[], None]):
+        self._iterator = iterator
+        self._release: Optional[Callable[[], None]] = release
+
+    def __iter__(self) -> "_PendingStream":
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            getattr(self._iterator, "close", lambda: None)()
+            release()
+
+    __del__ = close
+
+
+class DSPExecutor:
+    """A bounded ProcessPoolExecutor whose workers have warm DSP caches."""
+
+    def __init__(
+        self, max_workers: int = DSP_WORKERS, max_pending: int = DSP_MAX_PENDING_JOBS
+    ):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._mp_context = multiprocessing.get_context("spawn")
+        # Decode cache [hits, misses], counted by all workers together
+        self._cache_counts = self._mp_context.Array("q", 2)
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs currently running or waiting for a worker."""
+        return self._pending
+
+    def cache_stats(self) -> dict:
+        """Hits and misses of the decode cache over all workers."""
+        hits, misses = self._cache_counts[:]
+        return {"hits": hits, "misses": misses}
+
+    def start(self) -> None:
+        """Starts the worker processes; called lazily by run() if needed."""
+        with self._lock:
+            if self._pool is not None:
+                return
+            # "spawn" avoids forking a process that runs an event loop and threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=self._mp_context,
+                initializer=_init_worker,
+                initargs=(self._cache_counts,),
+            )
+            # Bring every worker up now, so the first requests find warm caches
+            for _ in range(self.max_workers):
+                self._pool.submit(int)
+
+    def _replace_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Discards a pool broken by a dead worker and starts a fresh one."""
+        with self._lock:
+            if self._pool is not broken:
+                return  # Already replaced after another job of the same pool
+            self._pool = None
+        logging.warning("A DSP worker process died, restarting the pool")
+        broken.shutdown(wait=False, cancel_futures=True)
+        self.start()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def _reserve(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise DSPQueueFull(
+                    f"{self._pending} DSP jobs pending (limit {self.max_pending})"
+                )
+            self._pending += 1
+
+    def _release(self, _: Optional[Future]) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    @contextlib.contextmanager
+    def session(self) -> Iterator[None]:
+        """
+        Admits a long-lived job that runs in this process, such as a live
+        decoding session; it counts as pending until the block is left.
+        Raises DSPQueueFull, before entering the block, when the executor
+        is saturated.
+        """
+        self._reserve()
+        try:
+            yield
+        finally:
+            self._release(None)
+
+    async def stream(self, fn, *args) -> Iterator:
+        """
+        Admits a job that runs in this process and yields its result piece
+        by piece, such as a streamed response. fn(*args) is called in a
+        thread and must return an iterator; the job counts as pending until
+        that iterator is exhausted or closed. Raises DSPQueueFull, before
+        calling fn, when the executor is saturated.
+        """
+        self._reserve()
+        try:
+            iterator = await asyncio.to_thread(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        return _PendingStream(iterator, functools.partial(self._release, None))
+
+    async def run(self, fn, *args):
+        """
+        Runs fn(*args) in a worker process and returns its result. Raises
+        DSPQueueFull without queueing the job when the executor is saturated,
+        and DSPWorkerLost if its worker died.
+        """
+        self._reserve()
+        try:
+            self.start()
+            pool = self._pool
+            future = pool.submit(fn, *args)
+        except BaseException as e:
+            self._release(None)
+            if isinstance(e, BrokenProcessPool):
+                self._replace_pool(pool)
+                raise DSPWorkerLost(str(e)) from None
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            self._replace_pool(pool)
+            raise DSPWorkerLost(str(e)) from None
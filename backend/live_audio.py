@@ -0,0 +1,295 @@
+"""
+Continuous live reception from an audio input device, and low-latency
+transmission to an output device.
+
+The input stream callback only copies samples into a ring buffer. A worker
+thread drains the buffer into an incremental decoder, so each packet is
+decoded as soon as its samples have arrived and memory stays bounded no
+matter how long the receiver listens.
+
+For transmission, a producer thread modulates packet after packet into a
+bounded queue that the output stream callback plays from, so the first
+packet is heard as soon as it has been modulated.
+"""
+
+import queue
+import threading
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from .config import (
+    LIVE_BLOCK_SIZE,
+    LIVE_BUFFER_SECONDS,
+    LIVE_TX_QUEUE_PACKETS,
+    SAMPLE_RATE,
+    ModemConfig,
+)
+from .modem_mfsk import (
+    ReceiverEvent,
+    StreamReceiver,
+    _packet_signals,
+    _prepare_mfsk_packets,
+    _resolve_config,
+)
+
+
+class RingBuffer:
+    """
+    Fixed-size single-producer/single-consumer sample buffer. If the reader
+    falls more than `capacity` samples behind, the oldest samples are
+    overwritten and counted in `dropped`.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.dropped = 0
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._written = 0  # Total samples written
+        self._read = 0  # Total samples read
+        self._available = threading.Condition()
+
+    def write(self, samples: np.ndarray) -> None:
+        with self._available:
+            if len(samples) > self.capacity:
+                self._written += len(samples) - self.capacity
+                samples = samples[-self.capacity :]
+            start = self._written % self.capacity
+            first = min(len(samples), self.capacity - start)
+            self._data[start : start + first] = samples[:first]
+            self._data[: len(samples) - first] = samples[first:]
+            self._written += len(samples)
+            if self._written - self._read > self.capacity:
+                self.dropped += self._written - self._read - self.capacity
+                self._read = self._written - self.capacity
+            self._available.notify()
+
+    def read(self, timeout: Optional[float] = None) -> np.ndarray:
+        """Returns all unread samples, waiting up to `timeout` for new ones."""
+        with self._available:
+            if self._written == self._read:
+                self._available.wait(timeout)
+            count = self._written - self._read
+            start = self._read % self.capacity
+            first = min(count, self.capacity - start)
+            samples = np.concatenate(
+                [self._data[start : start + first], self._data[: count - first]]
+            )
+            self._read = self._written
+            return samples
+
+
+def _default_input_stream(**kwargs):
+    # Imported lazily so the backend does not need PortAudio unless it listens
+    import sounddevice as sd
+
+    return sd.InputStream(**kwargs)
+
+
+def _default_output_stream(**kwargs):
+    import sounddevice as sd
+
+    return sd.OutputStream(**kwargs)
+
+
+class LiveReceiver:
+    """
+    Listens on an input stream and decodes packets as they arrive.
+
+    on_event is called with every event of the StreamReceiver, on the worker
+    thread. Nothing is kept of complete messages, so memory stays bounded
+    however long the receiver listens.
+    `stream_factory` is called with the keyword arguments of
+    sounddevice.InputStream and may be replaced by a stand-in for testing.
+    """
+
+    def __init__(
+        self,
+        on_event: Optional[Callable[[ReceiverEvent], None]] = None,
+        mode: str = "DEFAULT",
+        stream_factory: Callable = _default_input_stream,
+        blocksize: int = LIVE_BLOCK_SIZE,
+        buffer_seconds: float = LIVE_BUFFER_SECONDS,
+    ):
+        self.on_event = on_event
+        self.ring = RingBuffer(int(buffer_seconds * SAMPLE_RATE))
+        self.receiver = StreamReceiver(mode)
+        self._stream_factory = stream_factory
+        self._blocksize = blocksize
+        self._stream = None
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def start(self) -> None:
+        self._stopping.clear()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+        self._stream = self._stream_factory(
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="float32",
+            blocksize=self._blocksize,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def stop(self) -> None:
+        """Stops listening; samples already captured are still decoded."""
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._stopping.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def __enter__(self) -> "LiveReceiver":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def partial_message(self) -> Optional[str]:
+        """The text of the packets received so far of an incomplete message."""
+        return self.receiver.partial_message()
+
+    def _callback(self, indata, frames, time_info, status) -> None:
+        # Runs on the audio thread: copy and return, all work is on the worker
+        self.ring.write(indata[:, 0])
+
+    def _run(self) -> None:
+        while True:
+            stopping = self._stopping.is_set()
+            samples = self.ring.read(timeout=0.1)
+            if len(samples):
+                self.process(samples)
+            elif stopping:
+                return
+
+    def process(self, samples: np.ndarray) -> None:
+        """Decodes new samples and reports their events."""
+        for event in self.receiver.feed(samples):
+            if self.on_event:
+                self.on_event(event)
+
+
+class LiveTransmitter:
+    """
+    Plays a text message on an output stream while it is being modulated.
+
+    The text is split into packets and RS-encoded up front, so errors such as
+    a message that is too long are raised by the constructor. A producer
+    thread then modulates at most `queue_packets` packets ahead of playback.
+    `stream_factory` is called with the keyword arguments of
+    sounddevice.OutputStream and may be replaced by a stand-in for testing.
+    """
+
+    def __init__(
+        self,
+        text: str,
+        mode: Union[str, ModemConfig] = "DEFAULT",
+        stream_factory: Callable = _default_output_stream,
+        blocksize: int = LIVE_BLOCK_SIZE,
+        queue_packets: int = LIVE_TX_QUEUE_PACKETS,
+    ):
+        self.config = _resolve_config(mode)
+        self.underruns = 0  # Callbacks that had to insert silence mid-message
+        self.finished = threading.Event()  # Set once the last sample is queued
+        self._encoded_packets = _prepare_mfsk_packets(text.encode("utf-8"))
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_packets)
+        self._current = np.zeros(0, dtype=np.float32)
+        self._position = 0
+        self._playing = False
+        self._stream_factory = stream_factory
+        self._blocksize = blocksize
+        self._stream = None
+        self._producer: Optional[threading.Thread] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def total_packets(self) -> int:
+        return len(self._encoded_packets)
+
+    def start(self) -> None:
+        self._producer = threading.Thread(target=self._produce, daemon=True)
+        self._producer.start()
+        self._stream = self._stream_factory(
+            samplerate=SAMPLE_RATE,
+            channels=1,
+            dtype="float32",
+            blocksize=self._blocksize,
+            callback=self._callback,
+        )
+        self._stream.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the whole message has been handed to the stream, then
+        stops it, which lets the device play out its pending buffers. Returns
+        False if the timeout expired first.
+        """
+        if not self.finished.wait(timeout):
+            return False
+        self.stop()
+        return True
+
+    def stop(self) -> None:
+        """Stops playback immediately, also in the middle of the message."""
+        self._cancelled.set()
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        if self._producer is not None:
+            self._producer.join()
+            self._producer = None
+
+    def __enter__(self) -> "LiveTransmitter":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _put(self, item) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self) -> None:
+        for packet_signal in _packet_signals(self._encoded_packets, self.config):
+            # _packet_signals reuses its buffer, so queue a copy
+            if not self._put(packet_signal.astype(np.float32)):
+                return
+        self._put(None)
+
+    def _callback(self, outdata, frames, time_info, status) -> None:
+        # Runs on the audio thread: never block, play silence if nothing is ready
+        out = outdata[:, 0]
+        filled = 0
+        while filled < frames and not self.finished.is_set():
+            if self._position == len(self._current):
+                try:
+                    packet_signal = self._queue.get_nowait()
+                except queue.Empty:
+                    if self._playing:
+                        self.underruns += 1
+                    break
+                if packet_signal is None:
+                    self.finished.set()
+                    break
+                self._current, self._position = packet_signal, 0
+                self._playing = True
+            count = min(frames - filled, len(self._current) - self._position)
+            out[filled : filled + count] = self._current[
+                self._position : self._position + count
+            ]
+            filled += count
+            self._position += count
+        out[filled:] = 0.0
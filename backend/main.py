@@ -1,20 +1,78 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    UploadFile,
+    File,
+    Form,
+    Header,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response  # Changed from FileResponse
+from fastapi.responses import Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
 from pydantic import BaseModel
-import soundfile as sf
+from contextlib import asynccontextmanager
+import hashlib
+import io
+import json
 import logging
 import os
-import io  # Added for in-memory file handling
-from pydub import AudioSegment
-from .modem_mfsk import send_text_mfsk, receive_text_mfsk
+import tempfile
+from typing import Iterator, Optional, Union
+import numpy as np
+import soundfile as sf
+from .audio_io import AudioTooLong
+from .cache import GeneratedSignalCache
+from .config import (
+    AUDIO_FORMATS,
+    DSP_RETRY_AFTER,
+    GENERATED_SIGNAL_CACHE_BYTES,
+    GENERATED_SIGNAL_VERSION,
+    MODEM_MODES,
+    SAMPLE_RATE,
+    STREAMING_TEXT_THRESHOLD,
+    UPLOAD_MAX_BYTES,
+    WS_MAX_FRAME_SAMPLES,
+)
+from .dsp_executor import (
+    DSPExecutor,
+    DSPQueueFull,
+    DSPWorkerLost,
+    decode_audio,
+    generate_audio,
+    generate_audio_file,
+)
+from .modem_mfsk import (
+    CRCFailure,
+    PacketDecoded,
+    PacketFound,
+    ReceiverEvent,
+    StreamReceiver,
+    stream_text_mfsk,
+)
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-app = FastAPI()
+# CPU-heavy decode/generate work runs in this process pool, off the event loop
+dsp_executor = DSPExecutor()
+# Generated files of recent messages, keyed by (text, mode, format)
+generated_signals = GeneratedSignalCache(GENERATED_SIGNAL_CACHE_BYTES)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    dsp_executor.start()
+    yield
+    dsp_executor.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow all origins for development
 app.add_middleware(
@@ -29,67 +87,350 @@ app.add_middleware(
 class Message(BaseModel):
     text: str
     mode: str
+    # One of AUDIO_FORMATS; if omitted, the Accept header decides
+    format: Optional[str] = None
+
+
+def _server_busy() -> HTTPException:
+    """503 returned while the DSP executor queue is full or a worker died."""
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please retry later",
+        headers={"Retry-After": str(DSP_RETRY_AFTER)},
+    )
+
+
+# Media types accepted for each output format, including common aliases
+_FORMAT_MEDIA_TYPES = {
+    **{details.media_type: name for name, details in AUDIO_FORMATS.items()},
+    "audio/x-wav": "WAV",
+    "audio/wave": "WAV",
+    "audio/x-flac": "FLAC",
+}
+
+
+def _negotiate_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """
+    Output format of /generate_signal: the `format` field of the message if
+    given (400 if unknown), else the most preferred audio type of the Accept
+    header that can be generated. Wildcards and everything else mean WAV.
+    """
+    if requested is not None:
+        if requested.upper() not in AUDIO_FORMATS:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown audio format '{requested}'"
+            )
+        return requested.upper()
+    ranges = []
+    for media_range in (accept or "").split(","):
+        media_type, *params = (part.strip() for part in media_range.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0 and media_type.lower() in _FORMAT_MEDIA_TYPES:
+            ranges.append((quality, _FORMAT_MEDIA_TYPES[media_type.lower()]))
+    # max() keeps the first of equally preferred types
+    return max(ranges, key=lambda r: r[0])[1] if ranges else "WAV"
+
+
+def _download_headers(audio_format: str) -> dict:
+    extension = AUDIO_FORMATS[audio_format].extension
+    return {
+        "Content-Disposition": f"attachment; filename=generated_signal.{extension}",
+        # The format may depend on the Accept header
+        "Vary": "Accept",
+    }
+
+
+def _signal_etag(text: str, mode: str, audio_format: str) -> str:
+    """
+    Strong ETag of the file generated for a message. Generation is
+    deterministic, so it is known before any DSP runs; the libsndfile version
+    is included because it encodes FLAC and OGG.
+    """
+    identity = [
+        GENERATED_SIGNAL_VERSION,
+        sf.__libsndfile_version__,
+        text,
+        mode,
+        audio_format,
+    ]
+    digest = hashlib.blake2b(json.dumps(identity).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison)."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+# Read size when sending a generated file from disk
+_FILE_RESPONSE_CHUNK_BYTES = 1024 * 1024
+
+
+def _send_and_remove(path: str) -> Iterator[bytes]:
+    """Yields a temporary file in chunks and removes it once it is sent or abandoned."""
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(_FILE_RESPONSE_CHUNK_BYTES):
+                yield chunk
+    finally:
+        os.unlink(path)
 
 
 @app.post("/generate_signal")
-def generate_signal(message: Message):
-    """Generates an MFSK audio signal from text and returns it from memory."""
+async def generate_signal(
+    message: Message,
+    if_none_match: Optional[str] = Header(None),
+    accept: Optional[str] = Header(None),
+):
+    """Generates an MFSK audio signal from text and returns it from memory,
+    with a strong ETag; a matching If-None-Match is answered with a 304
+    without generating anything. The file is WAV, FLAC or OGG/Vorbis as
+    chosen by the message's `format` or the Accept header. Large WAV files
+    are streamed packet by packet; large FLAC and OGG files are written to
+    disk packet by packet and sent from there."""
+    audio_format = _negotiate_format(message.format, accept)
+    media_type = AUDIO_FORMATS[audio_format].media_type
+    etag = _signal_etag(message.text, message.mode, audio_format)
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept"})
+    headers = {**_download_headers(audio_format), "ETag": etag}
+    is_large = len(message.text.encode("utf-8")) >= STREAMING_TEXT_THRESHOLD
     try:
-        # This function now returns an in-memory buffer
-        audio_buffer = send_text_mfsk(message.text, mode=message.mode)
-
-        # Return the audio data directly from the buffer
-        return Response(
-            content=audio_buffer.read(),
-            media_type="audio/wav",
-            headers={
-                "Content-Disposition": "attachment; filename=generated_signal.wav"
-            },
-        )
+        if is_large and audio_format == "WAV":
+            # Packets are encoded up front so errors still produce a 500;
+            # the iterator then runs in the threadpool, one packet per chunk.
+            # It holds a slot of the executor until the response is sent, so
+            # streams count towards the same limit as pooled jobs.
+            wav_stream = await dsp_executor.stream(
+                stream_text_mfsk, message.text, message.mode
+            )
+            return StreamingResponse(wav_stream, media_type=media_type, headers=headers)
+
+        if is_large:
+            # A compressed file is only complete once it is closed, so it
+            # cannot be streamed while encoding; it is written packet by
+            # packet to a temporary file instead of being built in memory.
+            extension = AUDIO_FORMATS[audio_format].extension
+            fd, path = tempfile.mkstemp(suffix=f".{extension}")
+            os.close(fd)
+            try:
+                await dsp_executor.run(
+                    generate_audio_file,
+                    message.text,
+                    message.mode,
+                    audio_format,
+                    path,
+                )
+                headers["Content-Length"] = str(os.path.getsize(path))
+            except BaseException:
+                os.unlink(path)
+                raise
+            return StreamingResponse(
+                _send_and_remove(path), media_type=media_type, headers=headers
+            )
+
+        # The signal only depends on these, so popular messages are served
+        # from the cache without any DSP
+        key = (message.text, message.mode, audio_format)
+        audio_bytes = generated_signals.get(key)
+        if audio_bytes is None:
+            audio_bytes = await dsp_executor.run(
+                generate_audio, message.text, message.mode, audio_format
+            )
+            generated_signals.put(key, audio_bytes)
+
+        # Return the audio data directly from memory
+        return Response(content=audio_bytes, media_type=media_type, headers=headers)
+    except (DSPQueueFull, DSPWorkerLost):
+        raise _server_busy() from None
     except Exception as e:
         logging.exception("Error in generate_signal endpoint")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _upload_too_large(detail: str) -> HTTPException:
+    """413 returned for uploads over the configured size or duration."""
+    return HTTPException(status_code=413, detail=detail)
+
+
+def _upload_too_large_for_body() -> HTTPException:
+    return _upload_too_large(
+        f"Upload is larger than the maximum of {UPLOAD_MAX_BYTES} bytes"
+    )
+
+
+class _UploadSizeLimit:
+    """
+    ASGI middleware that refuses request bodies to /decode_signal over
+    UPLOAD_MAX_BYTES with a 413 before they are parsed: at once if the
+    Content-Length announces more, else as soon as more has arrived.
+    FastAPI passes an HTTPException raised while it reads the body through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != "/decode_signal":
+            await self.app(scope, receive, send)
+            return
+        content_length = Headers(scope=scope).get("content-length", "")
+        announced = int(content_length) if content_length.isdigit() else 0
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            if announced > UPLOAD_MAX_BYTES:
+                raise _upload_too_large_for_body()
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > UPLOAD_MAX_BYTES:
+                    raise _upload_too_large_for_body()
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+
+app.add_middleware(_UploadSizeLimit)
+
+
+async def _upload_source(file: UploadFile) -> Union[bytes, str]:
+    """
+    What decode_audio reads an upload from. Starlette has already received
+    the upload into a SpooledTemporaryFile, so it is not copied again: one
+    still in memory is passed as its contents, one rolled over to disk as a
+    /proc path to its (unnamed) temporary file, which the worker can open.
+    """
+    spooled = file.file
+    # The in-memory buffer of a SpooledTemporaryFile that has not rolled over
+    buffer = getattr(spooled, "_file", spooled)
+    if isinstance(buffer, io.BytesIO):
+        return buffer.getvalue()
+    path = f"/proc/{os.getpid()}/fd/{spooled.fileno()}"
+    if os.path.exists(path):
+        return path
+    # Without /proc (e.g. on macOS) the worker gets the contents instead
+    await file.seek(0)
+    return await file.read()
+
+
 @app.post("/decode_signal")
-async def decode_signal(file: UploadFile = File(...)):
-    """Decodes an MFSK audio signal from an uploaded audio file in memory,
-    converting it to WAV if necessary."""
+async def decode_signal(file: UploadFile = File(...), mode: str = Form("DEFAULT")):
+    """Decodes an MFSK audio signal from an uploaded audio file, trying `mode`
+    first. The format is recognised from the file's contents; uploads over the
+    configured size or duration are refused with a 413."""
+    if mode not in MODEM_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode '{mode}'")
     try:
-        audio_bytes = await file.read()
-        input_buffer = io.BytesIO(audio_bytes)
-        input_buffer.seek(0)
-
-        # Try to read directly with soundfile if it's a WAV, otherwise use pydub for conversion
-        if file.content_type == "audio/wav":
-            audio_data, _ = sf.read(input_buffer)
-        else:
-            # Determine input format based on content type or filename
-            input_format = file.content_type.split('/')[-1] if file.content_type else None
-            if not input_format and file.filename:
-                input_format = file.filename.split('.')[-1]
-            
-            # Fallback for unknown or generic types
-            if input_format not in ['wav', 'mp3', 'ogg', 'flac', 'webm']:
-                input_format = None # Let pydub try to guess or raise error
-
-            audio_segment = AudioSegment.from_file(input_buffer)
-
-            # Export to WAV format in memory for soundfile to read
-            wav_buffer = io.BytesIO()
-            audio_segment.export(wav_buffer, format="wav")
-            wav_buffer.seek(0)
-
-            audio_data, _ = sf.read(wav_buffer)
-
-        decoded_text, _, _, detected_mode = receive_text_mfsk(audio_data)
+        source = await _upload_source(file)
+        decoded_text, detected_mode = await dsp_executor.run(decode_audio, source, mode)
 
         return {"decoded_text": decoded_text, "detected_mode": detected_mode}
+    except HTTPException:
+        raise
+    except AudioTooLong as e:
+        raise _upload_too_large(str(e)) from None
+    except (DSPQueueFull, DSPWorkerLost):
+        raise _server_busy() from None
     except Exception as e:
         logging.exception("Error in decode_signal endpoint")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/decode_cache")
+async def decode_cache_stats():
+    """Hit and miss counts of the decode result cache over all workers."""
+    return dsp_executor.cache_stats()
+
+
+def _event_json(event: ReceiverEvent) -> dict:
+    """JSON message pushed to /ws/decode clients for a receiver event."""
+    found_at_s = event.position / SAMPLE_RATE
+    if isinstance(event, PacketFound):
+        return {
+            "event": "packet_found",
+            "found_at_s": found_at_s,
+            "mode": event.mode_name,
+        }
+    if isinstance(event, PacketDecoded):
+        return {
+            "event": "packet_decoded",
+            "found_at_s": found_at_s,
+            "mode": event.mode_name,
+            "packet_num": event.packet_num,
+            "total_packets": event.total_packets,
+            "rs_errors_corrected": event.rs_errors_corrected,
+            "text": event.payload.rstrip(b"\x00").decode("utf-8", "ignore"),
+        }
+    if isinstance(event, CRCFailure):
+        return {
+            "event": "crc_failure",
+            "found_at_s": found_at_s,
+            "rs_errors_corrected": event.rs_errors_corrected,
+        }
+    return {
+        "event": "message_complete",
+        "found_at_s": found_at_s,
+        "decoded_text": event.text,
+        "detected_mode": event.mode_name,
+        "total_packets": event.total_packets,
+    }
+
+
+@app.websocket("/ws/decode")
+async def ws_decode(websocket: WebSocket, mode: str = "DEFAULT"):
+    """Decodes audio while it is being captured. The client sends binary
+    frames of mono float32 samples at SAMPLE_RATE; every packet found or
+    decoded and every complete message is pushed back as a JSON message."""
+    await websocket.accept()
+    if mode not in MODEM_MODES:
+        await websocket.close(
+            code=status.WS_1008_POLICY_VIOLATION, reason=f"Unknown mode '{mode}'"
+        )
+        return
+    # The receiver keeps state across frames, so it runs in this process;
+    # each frame only costs a search over itself and a short carry-over.
+    # The session holds a slot of the executor while it is open, so live
+    # decoding counts towards the same limit as pooled jobs.
+    receiver = StreamReceiver(mode)
+    try:
+        with dsp_executor.session():
+            while True:
+                frame = await websocket.receive_bytes()
+                if len(frame) % 4 or len(frame) > 4 * WS_MAX_FRAME_SAMPLES:
+                    await websocket.close(
+                        code=status.WS_1003_UNSUPPORTED_DATA,
+                        reason="Expected frames of at most "
+                        f"{WS_MAX_FRAME_SAMPLES} float32 samples",
+                    )
+                    return
+                samples = np.frombuffer(frame, dtype="<f4")
+                events = await run_in_threadpool(lambda: list(receiver.feed(samples)))
+                for event in events:
+                    await websocket.send_json(_event_json(event))
+    except DSPQueueFull:
+        await websocket.close(
+            code=status.WS_1013_TRY_AGAIN_LATER,
+            reason="Server is busy, please retry later",
+        )
+    except WebSocketDisconnect:
+        pass
+
+
 # --- Static Files Hosting ---
 # This part serves the frontend files.
 # It must be after all the API routes.
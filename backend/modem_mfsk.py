@@ -1,11 +1,13 @@
 import numpy as np
 import zlib
 import io
+import os
 import soundfile as sf
 from scipy.linalg import hadamard
 from scipy.signal import chirp
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Union
+from functools import cached_property, lru_cache
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 # Import configuration from the central config file
 from .config import (
@@ -17,12 +19,21 @@ from .config import (
     PACKET_PAYLOAD_SIZE,
     PACKET_HEADER_SIZE,
     PACKET_CRC_SIZE,
+    PACKET_PAUSE_DURATION,
+    MAX_PACKETS,
     RS_NSYMS,
-    RSC,
+    RSC_BATCH,
     ModemConfig,
     MODEM_MODES,
     MIN_CORRELATION_THRESHOLD,
     SYNC_CORRELATION_THRESHOLD_FACTOR,
+    MODE_PROBE_PACKETS,
+    STREAM_SYNC_MIN_PEAK_RATIO,
+    DEMOD_ENGINE,
+    DSP_CACHE_SIZE,
+    BLOCK_DECODE_SECONDS,
+    AUDIO_FORMATS,
+    AudioFormat,
 )
 
 
@@ -42,12 +53,44 @@ class PacketAnalysis:
 def bits_to_bytes(bits: str) -> bytes:
     if not bits:
         return b""
-    if len(bits) % 8 != 0:
-        bits += "0" * (8 - len(bits) % 8)
-    return bytes(int(bits[i : i + 8], 2) for i in range(0, len(bits), 8))
+    bit_array = np.frombuffer(bits.encode("ascii"), dtype=np.uint8) - ord("0")
+    # np.packbits zero-pads the last byte, as the string version did
+    return np.packbits(bit_array).tobytes()
 
 
-def generate_chirp_signal() -> np.ndarray:
+def _bytes_to_symbols(data: bytes, bits_per_symbol: int) -> np.ndarray:
+    """
+    Splits the bit stream of `data` (MSB first) into groups of `bits_per_symbol`
+    bits and returns the group values. The last group is zero-padded.
+    """
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    padding = -len(bits) % bits_per_symbol
+    if padding:
+        bits = np.concatenate([bits, np.zeros(padding, dtype=np.uint8)])
+    weights = 1 << np.arange(bits_per_symbol - 1, -1, -1, dtype=np.intp)
+    return bits.reshape(-1, bits_per_symbol) @ weights
+
+
+def _symbols_to_byte_array(symbols: np.ndarray, bits_per_symbol: int) -> np.ndarray:
+    """
+    Packs symbol indices back into bytes along the last axis, so a
+    (packets x symbols) array gives one row of bytes per packet. Trailing
+    bits are zero-padded to a full byte.
+    """
+    symbols = np.asarray(symbols, dtype=np.intp)
+    shifts = np.arange(bits_per_symbol - 1, -1, -1, dtype=np.intp)
+    bits = ((symbols[..., None] >> shifts) & 1).astype(np.uint8)
+    return np.packbits(bits.reshape(*symbols.shape[:-1], -1), axis=-1)
+
+
+def _symbols_to_bytes(symbols: np.ndarray, bits_per_symbol: int) -> bytes:
+    """Inverse of _bytes_to_symbols; trailing bits are zero-padded to a full byte."""
+    return _symbols_to_byte_array(symbols, bits_per_symbol).tobytes()
+
+
+def generate_chirp_signal(
+    f0: float = PACKET_CHIRP_F0, f1: float = PACKET_CHIRP_F1
+) -> np.ndarray:
     t = np.linspace(
         0,
         PACKET_CHIRP_DURATION,
@@ -56,135 +99,632 @@ def generate_chirp_signal() -> np.ndarray:
     )
     return chirp(
         t,
-        f0=PACKET_CHIRP_F0,
-        f1=PACKET_CHIRP_F1,
+        f0=f0,
+        f1=f1,
         t1=PACKET_CHIRP_DURATION,
         method="linear",
     )
 
 
-def _bytes_to_signal(full_packet_bytes: bytes, config: ModemConfig) -> np.ndarray:
-    bits = "".join(format(byte, "08b") for byte in full_packet_bytes)
-    bit_groups = [
-        bits[i : i + config.bits_per_symbol]
-        for i in range(0, len(bits), config.bits_per_symbol)
-    ]
-    if len(bits) % config.bits_per_symbol != 0:
-        bit_groups[-1] = bit_groups[-1].ljust(config.bits_per_symbol, "0")
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+@lru_cache(maxsize=16)
+def _chirp_template(f0: float, f1: float) -> np.ndarray:
+    return _readonly(generate_chirp_signal(f0, f1))
 
-    total_symbols = len(bit_groups)
-    signal = np.zeros(total_symbols * config.samples_per_symbol)
-    samples_per_chip = config.samples_per_symbol // config.num_tones
-    t_chip = np.linspace(
-        0,
-        config.symbol_duration_ms / 1000 / config.num_tones,
-        samples_per_chip,
-        endpoint=False,
-    )
-    frequencies = [BASE_FREQ + i * config.tone_spacing for i in range(config.num_tones)]
-    hadamard_matrix = hadamard(config.num_tones)
 
-    for j, group in enumerate(bit_groups):
-        symbol_index = int(group, 2)
-        walsh_sequence = hadamard_matrix[symbol_index]
-        symbol_signal = np.zeros(config.samples_per_symbol)
-        phase_shift = np.random.choice([0, np.pi / 2, np.pi, -np.pi / 2])
-        for chip_idx, chip_val in enumerate(walsh_sequence):
-            frequency = frequencies[chip_idx]
-            tone = np.sin(2 * np.pi * frequency * t_chip + phase_shift) * chip_val
-            start_chip, end_chip = (
-                chip_idx * samples_per_chip,
-                (chip_idx + 1) * samples_per_chip,
+# Phase offsets a symbol may be sent with (chosen pseudo-randomly per symbol)
+SYMBOL_PHASE_OFFSETS = (0, np.pi / 2, np.pi, -np.pi / 2)
+
+
+class _DSPArtifacts:
+    """
+    Read-only DSP tables for one modem configuration, built lazily on first
+    use and shared by the modulator, the sync stage and the demodulators.
+    """
+
+    def __init__(self, config: ModemConfig):
+        self.config = config
+
+    @cached_property
+    def hadamard(self) -> np.ndarray:
+        return _readonly(hadamard(self.config.num_tones))
+
+    @cached_property
+    def tone_grid(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The chip tone frequencies and the time grid of a single chip."""
+        config = self.config
+        samples_per_chip = config.samples_per_symbol // config.num_tones
+        t_chip = np.linspace(
+            0,
+            config.symbol_duration_ms / 1000 / config.num_tones,
+            samples_per_chip,
+            endpoint=False,
+        )
+        frequencies = BASE_FREQ + np.arange(config.num_tones) * config.tone_spacing
+        return _readonly(frequencies), _readonly(t_chip)
+
+    @cached_property
+    def chip_tones(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(num_tones x samples_per_chip) sin/cos tables, row i being chip i's tone."""
+        frequencies, t_chip = self.tone_grid
+        phase = 2 * np.pi * frequencies[:, None] * t_chip[None, :]
+        return _readonly(np.sin(phase)), _readonly(np.cos(phase))
+
+    @cached_property
+    def reference_bank(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (num_tones x samples_per_symbol) sin/cos reference matrices, one row
+        per Walsh-Hadamard symbol.
+        """
+        num_tones = self.config.num_tones
+        samples_per_symbol = self.config.samples_per_symbol
+        sin_tones, cos_tones = self.chip_tones
+        used = sin_tones.size
+        banks = []
+        for tones in (sin_tones, cos_tones):
+            bank = np.zeros((num_tones, samples_per_symbol))
+            bank[:, :used] = (self.hadamard[:, :, None] * tones).reshape(
+                num_tones, used
             )
-            symbol_signal[start_chip:end_chip] = tone
-        start_symbol, end_symbol = (
-            j * config.samples_per_symbol,
-            (j + 1) * config.samples_per_symbol,
+            banks.append(_readonly(bank))
+        return banks[0], banks[1]
+
+    @cached_property
+    def symbol_table(self) -> np.ndarray:
+        """
+        Every possible symbol waveform as a
+        (num_tones x phase offsets x samples_per_symbol) table.
+        """
+        num_tones = self.config.num_tones
+        frequencies, t_chip = self.tone_grid
+        phase_offsets = np.array(SYMBOL_PHASE_OFFSETS)
+        tones = np.sin(
+            2 * np.pi * frequencies[None, :, None] * t_chip[None, None, :]
+            + phase_offsets[:, None, None]
         )
-        signal[start_symbol:end_symbol] = symbol_signal
-    return signal
+        used = num_tones * len(t_chip)
+        table = np.zeros(
+            (num_tones, len(phase_offsets), self.config.samples_per_symbol)
+        )
+        table[:, :, :used] = (self.hadamard[:, None, :, None] * tones[None]).reshape(
+            num_tones, len(phase_offsets), used
+        )
+        return _readonly(table)
 
+    @cached_property
+    def chirp(self) -> np.ndarray:
+        """The preamble chirp sent before every packet."""
+        return _chirp_template(self.config.chirp_f0, self.config.chirp_f1)
 
-def _prepare_mfsk_packet(chunk: bytes, packet_num: int, total_packets: int) -> bytes:
-    header = packet_num.to_bytes(2, "big") + total_packets.to_bytes(2, "big")
-    padding = b"\x00" * (PACKET_PAYLOAD_SIZE - len(chunk))
-    packet_content = header + chunk + padding
-    crc = zlib.crc32(packet_content).to_bytes(PACKET_CRC_SIZE, "big")
-    message_with_crc = packet_content + crc
-    return RSC.encode(message_with_crc)
+    @cached_property
+    def peak_amplitude(self) -> float:
+        """
+        Largest absolute sample any packet of this configuration can contain,
+        so signals can be normalized without scanning them first.
+        """
+        return float(max(np.abs(self.symbol_table).max(), np.abs(self.chirp).max()))
 
 
-def _assemble_mfsk_signal(encoded_message: bytes, config: ModemConfig) -> np.ndarray:
-    signal = _bytes_to_signal(encoded_message, config)
-    chirp_signal = generate_chirp_signal()
-    full_packet_signal = np.concatenate([chirp_signal, signal])
-    pause = np.zeros(int(SAMPLE_RATE * 0.1))
-    return np.concatenate([full_packet_signal, pause])
+@lru_cache(maxsize=DSP_CACHE_SIZE)
+def _dsp_artifacts(config: ModemConfig) -> _DSPArtifacts:
+    """
+    Returns the shared DSP artifacts of a configuration. The cache is LRU
+    bounded so arbitrary custom configs cannot grow memory without limit.
+    """
+    return _DSPArtifacts(config)
 
 
-def send_text_mfsk(text: str, mode: Union[str, ModemConfig] = "DEFAULT") -> io.BytesIO:
+def warm_dsp_caches() -> None:
     """
-    Generates the MFSK signal, normalizes it, and returns it in an in-memory WAV buffer.
+    Precomputes the DSP artifacts of every built-in mode and the preamble
+    chirps, so the first signal handled by a fresh process is not slowed down
+    by table construction.
     """
+    for config in MODEM_MODES.values():
+        artifacts = _dsp_artifacts(config)
+        artifacts.reference_bank
+        artifacts.symbol_table
+        artifacts.chirp
+    for _, f0, f1 in _preamble_chirps():
+        _chirp_template(f0, f1)
+
+
+def _symbol_phase_indices(full_packet_bytes: bytes, num_symbols: int) -> np.ndarray:
+    """
+    Index into SYMBOL_PHASE_OFFSETS for every symbol of a packet. The phases
+    only have to look random; they are drawn from a generator seeded with the
+    packet itself, so the same packet always gives the same signal.
+    """
+    rng = np.random.default_rng(zlib.crc32(full_packet_bytes))
+    return rng.integers(len(SYMBOL_PHASE_OFFSETS), size=num_symbols)
+
+
+def _bytes_to_signal(
+    full_packet_bytes: bytes, config: ModemConfig, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    symbol_indices = _bytes_to_symbols(full_packet_bytes, config.bits_per_symbol)
+    phase_indices = _symbol_phase_indices(full_packet_bytes, len(symbol_indices))
+    table = _dsp_artifacts(config).symbol_table
+    waveforms = table.reshape(-1, config.samples_per_symbol)
+    waveform_indices = symbol_indices * table.shape[1] + phase_indices
+    if out is None:
+        return waveforms[waveform_indices].reshape(-1)
+    # Gather straight into the caller's buffer without a temporary copy
+    np.take(
+        waveforms,
+        waveform_indices,
+        axis=0,
+        out=out.reshape(len(waveform_indices), config.samples_per_symbol),
+    )
+    return out
+
+
+def _packet_count(num_bytes: int) -> int:
+    """
+    Number of packets needed for a message of num_bytes. Raises ValueError if
+    the count does not fit the 2-byte packet number of the header.
+    """
+    total_packets = -(-num_bytes // PACKET_PAYLOAD_SIZE)
+    if total_packets > MAX_PACKETS:
+        raise ValueError(
+            f"Message of {num_bytes} bytes needs {total_packets} packets, but at "
+            f"most {MAX_PACKETS} ({MAX_PACKETS * PACKET_PAYLOAD_SIZE} bytes) fit "
+            "in the packet header"
+        )
+    return total_packets
+
+
+def _prepare_mfsk_packets(
+    byte_data: bytes, first_packet: int = 1, total_packets: Optional[int] = None
+) -> np.ndarray:
+    """
+    Splits the message into packets and RS-encodes all of them in one batch.
+    Returns one row of encoded bytes per packet: header, payload padded
+    with zeros, CRC and RS parity. To encode a long message piece by piece,
+    pass the number of its first packet and the packet count of the whole
+    message.
+    """
+    num_packets = -(-len(byte_data) // PACKET_PAYLOAD_SIZE)
+    if total_packets is None:
+        total_packets = _packet_count(len(byte_data))
+    content_size = PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE
+    messages = np.zeros((num_packets, content_size + PACKET_CRC_SIZE), np.uint8)
+    payloads = messages[:, PACKET_HEADER_SIZE:content_size].reshape(-1)
+    payloads[: len(byte_data)] = np.frombuffer(byte_data, dtype=np.uint8)
+    messages[:, PACKET_HEADER_SIZE:content_size] = payloads.reshape(
+        num_packets, PACKET_PAYLOAD_SIZE
+    )
+    for i, message in enumerate(messages, start=first_packet):
+        header = i.to_bytes(2, "big") + total_packets.to_bytes(2, "big")
+        message[:PACKET_HEADER_SIZE] = np.frombuffer(header, dtype=np.uint8)
+        crc = zlib.crc32(message[:content_size]).to_bytes(PACKET_CRC_SIZE, "big")
+        message[content_size:] = np.frombuffer(crc, dtype=np.uint8)
+    return RSC_BATCH.encode(messages)
+
+
+# Packets read and RS-encoded per batch when encoding from a file
+_FILE_READ_PACKETS = 256
+
+
+def _read_encoded_packets(source: BinaryIO, total_packets: int) -> Iterator[np.ndarray]:
+    """Reads a message incrementally and yields its encoded packets in order."""
+    packet_num = 1
+    while packet_num <= total_packets:
+        batch_packets = min(_FILE_READ_PACKETS, total_packets - packet_num + 1)
+        data = source.read(batch_packets * PACKET_PAYLOAD_SIZE)
+        if not data:
+            break
+        yield from _prepare_mfsk_packets(data, packet_num, total_packets)
+        packet_num += batch_packets
+
+
+def _samples_per_packet(config: ModemConfig) -> int:
+    """Number of samples carrying the RS-encoded packet (without chirp and pause)."""
+    bytes_per_packet_encoded = (
+        PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE + PACKET_CRC_SIZE + RS_NSYMS
+    )
+    bits_per_packet_encoded = bytes_per_packet_encoded * 8
+    symbols_per_packet = (
+        bits_per_packet_encoded + config.bits_per_symbol - 1
+    ) // config.bits_per_symbol
+    return symbols_per_packet * config.samples_per_symbol
+
+
+def _packet_signal_length(config: ModemConfig) -> int:
+    """Total number of samples of one transmitted packet: chirp, data and pause."""
+    chirp_len = int(SAMPLE_RATE * PACKET_CHIRP_DURATION)
+    pause_len = int(SAMPLE_RATE * PACKET_PAUSE_DURATION)
+    return chirp_len + _samples_per_packet(config) + pause_len
+
+
+def _write_mfsk_packet(
+    encoded_message: bytes,
+    config: ModemConfig,
+    out: np.ndarray,
+    chirp_signal: Optional[np.ndarray] = None,
+) -> None:
+    """Writes chirp, data and pause of one packet into `out` (one packet long)."""
+    if chirp_signal is None:
+        chirp_signal = _dsp_artifacts(config).chirp
+    chirp_len = len(chirp_signal)
+    data_end = chirp_len + _samples_per_packet(config)
+    out[:chirp_len] = chirp_signal
+    _bytes_to_signal(encoded_message, config, out=out[chirp_len:data_end])
+    out[data_end:] = 0.0
+
+
+def _resolve_config(mode: Union[str, ModemConfig]) -> ModemConfig:
     if isinstance(mode, str):
-        config = MODEM_MODES.get(mode, MODEM_MODES["DEFAULT"])
-    else:
-        config = mode
+        return MODEM_MODES.get(mode, MODEM_MODES["DEFAULT"])
+    return mode
+
+
+def _resolve_audio_format(audio_format: str) -> Tuple[str, AudioFormat]:
+    """Returns the soundfile name and details of a format, e.g. "flac"."""
+    name = audio_format.upper()
+    if name not in AUDIO_FORMATS:
+        raise ValueError(
+            f"Unsupported audio format {audio_format!r}, "
+            f"expected one of {', '.join(AUDIO_FORMATS)}"
+        )
+    return name, AUDIO_FORMATS[name]
+
+
+def _file_samples(signal: np.ndarray, format_name: str) -> np.ndarray:
+    """
+    The samples to write to a file of the given format. libsndfile rounds
+    floats to 16 bits differently for FLAC than for WAV, so FLAC is given
+    the samples of the WAV file as integers and stores exactly those.
+    """
+    if format_name == "FLAC":
+        return np.frombuffer(_float_to_pcm16(signal), dtype="<i2")
+    return signal
 
-    byte_data = text.encode("utf-8")
-    chunks = [
-        byte_data[i : i + PACKET_PAYLOAD_SIZE]
-        for i in range(0, len(byte_data), PACKET_PAYLOAD_SIZE)
-    ]
-    all_packets_signal = np.array([])
-    total_chunks = len(chunks)
-    for i, chunk in enumerate(chunks):
-        encoded_message = _prepare_mfsk_packet(chunk, i + 1, total_chunks)
-        packet_signal = _assemble_mfsk_signal(encoded_message, config)
-        all_packets_signal = np.concatenate([all_packets_signal, packet_signal])
-
-    # Normalize the signal to prevent clipping
-    max_amplitude = np.max(np.abs(all_packets_signal))
-    if max_amplitude > 1e-9:
-        all_packets_signal /= max_amplitude
 
+def send_text_mfsk(
+    text: str, mode: Union[str, ModemConfig] = "DEFAULT", audio_format: str = "WAV"
+) -> io.BytesIO:
+    """
+    Generates the MFSK signal, normalizes it, and returns it in an in-memory
+    audio file, WAV unless another of AUDIO_FORMATS is given.
+    """
     # Write to an in-memory buffer instead of a file
     buffer = io.BytesIO()
-    sf.write(buffer, all_packets_signal, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    write_text_mfsk(text, buffer, mode, audio_format)
     buffer.seek(0)  # Rewind the buffer to the beginning for reading
     return buffer
 
 
-def _synchronize_mfsk_signal(
-    signal: np.ndarray, config: ModemConfig
-) -> tuple[np.ndarray, list[int], int, int]:
+def write_text_mfsk(
+    text: str,
+    output: Union[str, BinaryIO],
+    mode: Union[str, ModemConfig] = "DEFAULT",
+    audio_format: str = "WAV",
+) -> int:
+    """
+    Writes the MFSK signal of text to an audio file (a path or a file
+    object) and returns the number of packets written. The signal is
+    modulated and written packet by packet, so apart from the file itself
+    memory use does not grow with the length of the text.
+    """
+    config = _resolve_config(mode)
+    format_name, format_details = _resolve_audio_format(audio_format)
+    encoded_packets = _prepare_mfsk_packets(text.encode("utf-8"))
+    _write_audio(output, encoded_packets, config, format_name, format_details)
+    return len(encoded_packets)
+
+
+def _write_audio(
+    output: Union[str, BinaryIO],
+    encoded_packets: Iterable[np.ndarray],
+    config: ModemConfig,
+    format_name: str,
+    format_details: AudioFormat,
+) -> None:
+    """Modulates the packets one by one into a mono audio file."""
+    with sf.SoundFile(
+        output, "w", SAMPLE_RATE, 1, format_details.subtype, format=format_name
+    ) as audio_file:
+        for packet_signal in _packet_signals(encoded_packets, config):
+            audio_file.write(_file_samples(packet_signal, format_name))
+
+
+# Largest data chunk whose RIFF size still fits the 4-byte field
+_WAV_MAX_DATA_BYTES = 0xFFFFFFFF - 36
+
+
+def _wav_header(num_frames: int) -> bytes:
+    """
+    Header of a mono 16-bit PCM WAV file holding num_frames samples. Raises
+    ValueError if that many do not fit in a WAV file.
+    """
+    data_size = num_frames * 2
+    if data_size > _WAV_MAX_DATA_BYTES:
+        raise ValueError(
+            f"Signal of {num_frames} samples exceeds the 4 GB size limit of WAV files"
+        )
+    return (
+        b"RIFF"
+        + (36 + data_size).to_bytes(4, "little")
+        + b"WAVEfmt "
+        + (16).to_bytes(4, "little")  # fmt chunk size
+        + (1).to_bytes(2, "little")  # PCM
+        + (1).to_bytes(2, "little")  # mono
+        + SAMPLE_RATE.to_bytes(4, "little")
+        + (SAMPLE_RATE * 2).to_bytes(4, "little")  # byte rate
+        + (2).to_bytes(2, "little")  # block align
+        + (16).to_bytes(2, "little")  # bits per sample
+        + b"data"
+        + data_size.to_bytes(4, "little")
+    )
+
+
+def _float_to_pcm16(samples: np.ndarray) -> bytes:
+    """
+    Converts normalized samples to headerless little-endian PCM_16. libsndfile
+    does the conversion, so the bytes match what sf.write puts in a WAV file.
+    """
+    buffer = io.BytesIO()
+    sf.write(
+        buffer, samples, SAMPLE_RATE, format="RAW", subtype="PCM_16", endian="LITTLE"
+    )
+    return buffer.getvalue()
+
+
+def stream_text_mfsk(
+    text: str, mode: Union[str, ModemConfig] = "DEFAULT"
+) -> Iterator[bytes]:
+    """
+    Streaming counterpart of send_text_mfsk: returns an iterator over the
+    WAV file, yielding the header first and then one block of PCM_16 samples
+    per packet. Memory use does not grow with the length of the text.
+    The header and packets are prepared before this returns, so errors (such
+    as a signal too long for a WAV file) are raised here rather than while
+    iterating.
+    """
+    config = _resolve_config(mode)
+    byte_data = text.encode("utf-8")
+    header = _wav_header(_packet_count(len(byte_data)) * _packet_signal_length(config))
+    encoded_packets = _prepare_mfsk_packets(byte_data)
+    return _stream_wav(header, encoded_packets, config)
+
+
+def _stream_wav(
+    header: bytes, encoded_packets: np.ndarray, config: ModemConfig
+) -> Iterator[bytes]:
+    yield header
+    for packet_signal in _packet_signals(encoded_packets, config):
+        yield _float_to_pcm16(packet_signal)
+
+
+def _packet_signals(
+    encoded_packets: Iterable[np.ndarray], config: ModemConfig
+) -> Iterator[np.ndarray]:
+    """
+    Yields the normalized signal of every packet. The same buffer is reused
+    for each packet, so consume it before advancing the iterator.
+    """
+    packet_signal = np.empty(_packet_signal_length(config))
+    artifacts = _dsp_artifacts(config)
+    for encoded_message in encoded_packets:
+        _write_mfsk_packet(encoded_message, config, packet_signal, artifacts.chirp)
+        packet_signal /= artifacts.peak_amplitude
+        yield packet_signal
+
+
+def send_file_mfsk(
+    input_path: str,
+    output_path: str,
+    mode: Union[str, ModemConfig] = "DEFAULT",
+    audio_format: str = "WAV",
+) -> int:
+    """
+    Encodes the contents of input_path into an audio file at output_path
+    (PCM_16 WAV unless another of AUDIO_FORMATS is given) and returns the
+    number of packets written. The input is read and modulated packet by
+    packet, so memory use does not depend on its size. Raises ValueError,
+    before anything is written, if the input needs more packets than the
+    header can number or the format is unknown.
+    """
+    config = _resolve_config(mode)
+    format_name, format_details = _resolve_audio_format(audio_format)
+    total_packets = _packet_count(os.path.getsize(input_path))
+    with open(input_path, "rb") as source:
+        _write_audio(
+            output_path,
+            _read_encoded_packets(source, total_packets),
+            config,
+            format_name,
+            format_details,
+        )
+    return total_packets
+
+
+# Signals shorter than this multiple of the chirp length are correlated
+# directly; longer ones go through the overlap-save FFT correlator.
+_DIRECT_CORRELATION_MAX_RATIO = 2
+# Number of overlap-save blocks transformed per batched FFT call
+_FFT_CORRELATION_BATCH_BLOCKS = 64
+
+
+def _correlation_fft_size(template_len: int, signal_len: int) -> int:
+    """FFT block size for overlap-save: about 4x the template, capped by the signal."""
+    block = 1 << (4 * template_len - 1).bit_length()
+    return min(block, 1 << (signal_len - 1).bit_length())
+
+
+@lru_cache(maxsize=32)
+def _chirp_spectrum(nfft: int, f0: float, f1: float) -> np.ndarray:
+    """Spectrum of a time-reversed packet chirp, zero-padded to `nfft`."""
+    return _readonly(np.fft.rfft(_chirp_template(f0, f1)[::-1], nfft))
+
+
+def _chirp_correlation_pieces(
+    signal: np.ndarray, chirp_ranges: List[Tuple[float, float]]
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    Valid-mode cross-correlation of the signal with each (f0, f1) chirp of a
+    matched filter bank, yielded in consecutive pieces as (start, chirp
+    index, correlation piece), so callers never have to hold the whole
+    correlation of every chirp. Short signals are correlated directly;
+    longer ones go through overlap-save FFT blocks whose spectra are shared
+    by all chirps.
+    """
+    chirp_len = int(SAMPLE_RATE * PACKET_CHIRP_DURATION)
+    if len(signal) < _DIRECT_CORRELATION_MAX_RATIO * chirp_len:
+        for index, (f0, f1) in enumerate(chirp_ranges):
+            yield 0, index, np.correlate(signal, _chirp_template(f0, f1), mode="valid")
+        return
+    nfft = _correlation_fft_size(chirp_len, len(signal))
+    out_len = len(signal) - chirp_len + 1
+    step = nfft - chirp_len + 1
+    batch_len = step * _FFT_CORRELATION_BATCH_BLOCKS
+    for batch_start in range(0, out_len, batch_len):
+        batch_out = min(batch_len, out_len - batch_start)
+        num_blocks = -(-batch_out // step)
+        segment_len = (num_blocks - 1) * step + nfft
+        segment = signal[batch_start : batch_start + segment_len]
+        if len(segment) < segment_len:
+            segment = np.concatenate([segment, np.zeros(segment_len - len(segment))])
+        blocks = np.lib.stride_tricks.sliding_window_view(segment, nfft)[::step]
+        block_spectra = np.fft.rfft(blocks, axis=1)
+        for index, (f0, f1) in enumerate(chirp_ranges):
+            filtered = np.fft.irfft(
+                block_spectra * _chirp_spectrum(nfft, f0, f1), nfft, axis=1
+            )
+            piece = filtered[:, chirp_len - 1 :].reshape(-1)[:batch_out]
+            yield batch_start, index, piece
+
+
+def _correlate_with_chirps(
+    signal: np.ndarray, chirp_ranges: List[Tuple[float, float]]
+) -> np.ndarray:
+    """
+    Valid-mode cross-correlation of the signal with each (f0, f1) chirp.
+    Returns one row per chirp.
+    """
+    chirp_len = int(SAMPLE_RATE * PACKET_CHIRP_DURATION)
+    correlations = np.empty((len(chirp_ranges), abs(len(signal) - chirp_len) + 1))
+    for start, index, piece in _chirp_correlation_pieces(signal, chirp_ranges):
+        correlations[index, start : start + len(piece)] = piece
+    return correlations
+
+
+def _correlate_with_chirp(
+    signal: np.ndarray, f0: float = PACKET_CHIRP_F0, f1: float = PACKET_CHIRP_F1
+) -> np.ndarray:
+    """Valid-mode cross-correlation of the signal with a single packet chirp."""
+    return _correlate_with_chirps(signal, [(f0, f1)])[0]
+
+
+def _preamble_chirps() -> List[Tuple[Optional[str], float, float]]:
+    """
+    The matched-filter bank: the legacy chirp (old recordings and custom
+    configs, mode unknown) plus one chirp per mode that signals itself.
+    """
+    preambles = [(None, PACKET_CHIRP_F0, PACKET_CHIRP_F1)]
+    for name, config in MODEM_MODES.items():
+        if all((config.chirp_f0, config.chirp_f1) != p[1:] for p in preambles):
+            preambles.append((name, config.chirp_f0, config.chirp_f1))
+    return preambles
+
+
+@dataclass
+class _ChirpSync:
+    """Mode-independent synchronization state shared by all mode attempts."""
+
+    signal: np.ndarray  # Normalized mono signal
+    correlation: np.ndarray  # Correlation with the detected preamble chirp
+    chirp_len: int
+    threshold: float = 0.0
+    first_peak: Optional[int] = None  # None if no chirp was detected
+    mode_name: Optional[str] = None  # Mode signalled by the preamble, if any
+
+
+def _normalize_signal(signal: np.ndarray) -> np.ndarray:
+    """Mixes down to mono and scales the signal to a fixed RMS (as a new array)."""
     if signal.ndim == 2:
         signal = signal.mean(axis=1)
     target_rms = 0.1
     current_rms = np.sqrt(np.mean(signal**2))
     gain = target_rms / (current_rms + 1e-9)
-    signal *= gain
-    chirp_template = generate_chirp_signal()
-    chirp_len = len(chirp_template)
-    correlation = np.correlate(signal, chirp_template, mode="valid")
-    if np.max(correlation) < MIN_CORRELATION_THRESHOLD:
-        return signal, [], 0, 0
-    threshold = np.max(correlation) * SYNC_CORRELATION_THRESHOLD_FACTOR
-    peak_indices = np.where(correlation > threshold)[0]
-    if not peak_indices.any():
-        return signal, [], 0, 0
-    bytes_per_packet_encoded = (
-        PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE + PACKET_CRC_SIZE + RS_NSYMS
+    return signal * gain
+
+
+def _sync_chirps(signal: np.ndarray, earliest: bool = False) -> _ChirpSync:
+    """
+    Normalizes the signal and runs it once through the preamble filter bank.
+    The best-matching chirp identifies the mode (or the legacy preamble), and
+    its correlation is shared by all mode attempts. With earliest=True the
+    chirp that crosses the threshold first wins instead, for signals that
+    may hold several transmissions in different modes.
+
+    The bank is searched piece by piece, keeping only the peak of every
+    chirp (and where its correlation reached new highs, for earliest=True).
+    The correlation of the winning chirp is then computed once more, so
+    memory stays at about one correlation however many preambles there are.
+    """
+    signal = _normalize_signal(signal)
+    chirp_len = int(SAMPLE_RATE * PACKET_CHIRP_DURATION)
+    preambles = _preamble_chirps()
+    peaks = np.full(len(preambles), -np.inf)
+    # (positions, values) of every new running maximum of each correlation;
+    # the first sample above any threshold is always one of them
+    highs: List[List[Tuple[np.ndarray, np.ndarray]]] = [[] for _ in preambles]
+    for start, index, piece in _chirp_correlation_pieces(
+        signal, [p[1:] for p in preambles]
+    ):
+        if len(piece) == 0:
+            continue
+        if earliest:
+            running = np.maximum(np.maximum.accumulate(piece), peaks[index])
+            previous = np.concatenate(([peaks[index]], running[:-1]))
+            rises = np.flatnonzero(running > previous)
+            highs[index].append((start + rises, piece[rises]))
+        peaks[index] = max(peaks[index], piece.max())
+    if not np.isfinite(peaks).any():
+        return _ChirpSync(signal, np.zeros(0), chirp_len)
+    best = int(np.argmax(peaks))
+    max_correlation = peaks[best]
+    threshold = max_correlation * SYNC_CORRELATION_THRESHOLD_FACTOR
+    if earliest:
+        crossings = []
+        for chirp_highs in highs:
+            positions = np.concatenate([h[0] for h in chirp_highs] or [[]])
+            above = np.flatnonzero(
+                np.concatenate([h[1] for h in chirp_highs] or [[]]) > threshold
+            )
+            crossings.append(positions[above[0]] if len(above) else np.inf)
+        best = int(np.argmin(crossings))
+    sync = _ChirpSync(
+        signal, _correlate_with_chirp(signal, *preambles[best][1:]), chirp_len
     )
-    bits_per_packet_encoded = bytes_per_packet_encoded * 8
-    symbols_per_packet = (
-        bits_per_packet_encoded + config.bits_per_symbol - 1
-    ) // config.bits_per_symbol
-    samples_per_packet = symbols_per_packet * config.samples_per_symbol
-    min_spacing = int(chirp_len + samples_per_packet)
+    if max_correlation < MIN_CORRELATION_THRESHOLD:
+        return sync
+    sync.threshold = threshold
+    # The first sample above the threshold is usually on the rising edge of
+    # the peak; settle on the actual maximum within one chirp length.
+    first_crossing = int(np.argmax(sync.correlation > sync.threshold))
+    sync.first_peak = first_crossing + int(
+        np.argmax(sync.correlation[first_crossing : first_crossing + chirp_len])
+    )
+    sync.mode_name = preambles[best][0]
+    return sync
+
+
+def _find_packet_peaks(sync: _ChirpSync, samples_per_packet: int) -> list[int]:
+    """Walks the shared correlation from the first chirp using a mode's packet spacing."""
+    if sync.first_peak is None:
+        return []
+    correlation, threshold = sync.correlation, sync.threshold
+    min_spacing = int(sync.chirp_len + samples_per_packet)
     search_window_size = int(min_spacing * 0.1)
-    peaks = [peak_indices[0]]
-    last_peak = peak_indices[0]
+    peaks = [sync.first_peak]
+    last_peak = sync.first_peak
     while True:
         expected_next_peak = last_peak + min_spacing
         search_start = expected_next_peak - search_window_size
@@ -194,14 +734,50 @@ def _synchronize_mfsk_signal(
         window = correlation[search_start:search_end]
         if len(window) == 0 or np.max(window) < threshold:
             break
-        next_peak = search_start + np.argmax(window)
+        next_peak = search_start + int(np.argmax(window))
         peaks.append(next_peak)
         last_peak = next_peak
-    return signal, peaks, chirp_len, samples_per_packet
+    return peaks
 
 
-def _demodulate_mfsk_symbols(packet_chunk: np.ndarray, config: ModemConfig) -> str:
-    received_bits = []
+def _truncated_packet(
+    sync: _ChirpSync, samples_per_packet: int
+) -> Optional[Tuple[int, np.ndarray]]:
+    """
+    (Negative peak, packet samples) of where a packet would be whose chirp
+    was cut off by the start of the recording, just before the first chirp
+    found. It cannot be seen in the correlation, but its data may still be
+    complete; usually there is nothing there, so callers only keep it if it
+    decodes.
+    """
+    if sync.first_peak is None:
+        return None
+    pause_len = int(SAMPLE_RATE * PACKET_PAUSE_DURATION)
+    peak = sync.first_peak - sync.chirp_len - samples_per_packet - pause_len
+    if not -sync.chirp_len <= peak < 0:
+        return None
+    packet_start = peak + sync.chirp_len
+    return peak, sync.signal[packet_start : packet_start + samples_per_packet]
+
+
+def _packet_chunks(sync: _ChirpSync, peaks: list[int], samples_per_packet: int):
+    """Yields (peak, packet samples) for every peak whose packet is complete."""
+    for peak_start in peaks:
+        packet_start = peak_start + sync.chirp_len
+        packet_end = packet_start + samples_per_packet
+        if packet_end > len(sync.signal):
+            break
+        yield peak_start, sync.signal[packet_start:packet_end]
+
+
+def _demodulate_mfsk_symbols_reference(
+    packet_chunk: np.ndarray, config: ModemConfig
+) -> np.ndarray:
+    """
+    Straightforward per-symbol, per-row correlator. Slow, but kept as the
+    ground truth the faster engines are checked against.
+    """
+    received_symbols = []
     num_symbols = len(packet_chunk) // config.samples_per_symbol
     frequencies = [BASE_FREQ + i * config.tone_spacing for i in range(config.num_tones)]
     hadamard_matrix = hadamard(config.num_tones)
@@ -239,8 +815,87 @@ def _demodulate_mfsk_symbols(packet_chunk: np.ndarray, config: ModemConfig) -> s
             corr_cos = np.sum(symbol_chunk * correlation_signal_cos)
             correlations[k] = np.sqrt(corr_sin**2 + corr_cos**2)
         best_symbol_index = np.argmax(np.abs(correlations))
-        received_bits.append(format(best_symbol_index, f"0{config.bits_per_symbol}b"))
-    return "".join(received_bits)
+        received_symbols.append(best_symbol_index)
+    return np.array(received_symbols, dtype=np.intp)
+
+
+def _demodulate_mfsk_symbols_bank(
+    packet_chunk: np.ndarray, config: ModemConfig
+) -> np.ndarray:
+    """Scores every symbol of the packet at once against the reference bank."""
+    num_symbols = len(packet_chunk) // config.samples_per_symbol
+    if num_symbols == 0:
+        return np.zeros(0, dtype=np.intp)
+    sin_bank, cos_bank = _dsp_artifacts(config).reference_bank
+    symbols = packet_chunk[: num_symbols * config.samples_per_symbol].reshape(
+        num_symbols, config.samples_per_symbol
+    )
+    correlations = np.hypot(symbols @ sin_bank.T, symbols @ cos_bank.T)
+    return np.argmax(correlations, axis=1)
+
+
+def _fast_walsh_hadamard(values: np.ndarray) -> np.ndarray:
+    """
+    Fast Walsh-Hadamard transform along the last axis, in the same (Sylvester)
+    row order as scipy.linalg.hadamard. The length must be a power of 2.
+    """
+    n = values.shape[-1]
+    lead = values.shape[:-1]
+    transformed = values
+    h = 1
+    while h < n:
+        pairs = transformed.reshape(*lead, n // (2 * h), 2, h)
+        first, second = pairs[..., 0, :], pairs[..., 1, :]
+        transformed = np.stack((first + second, first - second), axis=-2).reshape(
+            *lead, n
+        )
+        h *= 2
+    return transformed
+
+
+def _demodulate_mfsk_symbols_fwht(
+    packet_chunk: np.ndarray, config: ModemConfig
+) -> np.ndarray:
+    """
+    Projects every chip onto its tone once, then recovers all Walsh row
+    correlations of a symbol with a fast Walsh-Hadamard transform.
+    """
+    num_symbols = len(packet_chunk) // config.samples_per_symbol
+    if num_symbols == 0:
+        return np.zeros(0, dtype=np.intp)
+    sin_tones, cos_tones = _dsp_artifacts(config).chip_tones
+    samples_per_chip = sin_tones.shape[1]
+    chips = packet_chunk[: num_symbols * config.samples_per_symbol].reshape(
+        num_symbols, config.samples_per_symbol
+    )[:, : config.num_tones * samples_per_chip]
+    chips = chips.reshape(num_symbols, config.num_tones, samples_per_chip)
+    projection_sin = np.einsum("sct,ct->sc", chips, sin_tones)
+    projection_cos = np.einsum("sct,ct->sc", chips, cos_tones)
+    correlations = np.hypot(
+        _fast_walsh_hadamard(projection_sin), _fast_walsh_hadamard(projection_cos)
+    )
+    return np.argmax(correlations, axis=1)
+
+
+DEMOD_ENGINES = {
+    "reference": _demodulate_mfsk_symbols_reference,
+    "bank": _demodulate_mfsk_symbols_bank,
+    "fwht": _demodulate_mfsk_symbols_fwht,
+}
+
+
+def _demodulate_mfsk_symbols(
+    packet_chunk: np.ndarray, config: ModemConfig, engine: str = DEMOD_ENGINE
+) -> np.ndarray:
+    """Returns the index of the detected Walsh-Hadamard symbol for each symbol slot."""
+    try:
+        demodulate = DEMOD_ENGINES[engine]
+    except KeyError:
+        raise ValueError(
+            f"Unknown demodulation engine '{engine}'. "
+            f"Available: {list(DEMOD_ENGINES.keys())}"
+        )
+    return demodulate(packet_chunk, config)
 
 
 def _verify_crc(packet_content: bytes, received_crc_bytes: bytes) -> bool:
@@ -251,135 +906,492 @@ def _verify_crc(packet_content: bytes, received_crc_bytes: bytes) -> bool:
     return received_crc == calculated_crc
 
 
-def _decode_mfsk_packet(
-    demod_bits_str: str, config: ModemConfig, analyze_mode: bool = False
+def _parse_decoded_packet(
+    decoded_message: bytes, rs_errors_corrected: int
 ) -> Tuple[Optional[bytes], Optional[int], Optional[int], int, bool]:
-    expected_encoded_bits_len = (
-        PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE + PACKET_CRC_SIZE + RS_NSYMS
-    ) * 8
-    if len(demod_bits_str) < expected_encoded_bits_len:
-        return None, None, None, -1, False
-    demod_bits_str = demod_bits_str[:expected_encoded_bits_len]
-    encoded_bytes = bits_to_bytes(demod_bits_str)
+    """Checks the CRC of an RS-decoded packet and splits off its header."""
+    packet_content = decoded_message[: PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE]
+    received_crc_bytes = decoded_message[PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE :]
 
-    rs_errors_corrected = -1
-    crc_ok = False
+    crc_ok = _verify_crc(packet_content, received_crc_bytes)
 
-    try:
-        decoded_message, _, errata_pos = RSC.decode(encoded_bytes)
-        rs_errors_corrected = len(errata_pos)
+    header = packet_content[:PACKET_HEADER_SIZE]
+    packet_num = int.from_bytes(header[:2], "big")
+    total_packets = int.from_bytes(header[2:], "big")
+    if crc_ok:
+        payload = packet_content[PACKET_HEADER_SIZE:]
+        return payload, packet_num, total_packets, rs_errors_corrected, True
+    # Still return header info if possible, even with bad CRC, for analysis
+    return None, packet_num, total_packets, rs_errors_corrected, False
 
-        packet_content = decoded_message[: PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE]
-        received_crc_bytes = decoded_message[PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE :]
 
-        crc_ok = _verify_crc(packet_content, received_crc_bytes)
+# Packets demodulated per call; bounds the size of the intermediate
+# correlation arrays on long recordings.
+_DEMOD_BATCH_PACKETS = 32
 
-        if crc_ok:
-            header = packet_content[:PACKET_HEADER_SIZE]
-            payload = packet_content[PACKET_HEADER_SIZE:]
-            packet_num = int.from_bytes(header[:2], "big")
-            total_packets = int.from_bytes(header[2:], "big")
-            return payload, packet_num, total_packets, rs_errors_corrected, True
-        else:
-            # Still return header info if possible, even with bad CRC, for analysis
-            header = packet_content[:PACKET_HEADER_SIZE]
-            packet_num = int.from_bytes(header[:2], "big")
-            total_packets = int.from_bytes(header[2:], "big")
-            return None, packet_num, total_packets, rs_errors_corrected, False
 
-    except Exception:
-        return None, None, None, rs_errors_corrected, False
+def _demodulate_and_decode(
+    packet_chunks: List[np.ndarray], config: ModemConfig
+) -> List[Tuple[Optional[bytes], Optional[int], Optional[int], int, bool]]:
+    """
+    Demodulates packets in batches and RS-decodes each batch together; only
+    packets with nonzero syndromes go through full error correction.
+    """
+    encoded_bytes_len = (
+        PACKET_HEADER_SIZE + PACKET_PAYLOAD_SIZE + PACKET_CRC_SIZE + RS_NSYMS
+    )
+    results = []
+    for start in range(0, len(packet_chunks), _DEMOD_BATCH_PACKETS):
+        batch = packet_chunks[start : start + _DEMOD_BATCH_PACKETS]
+        demod_symbols = _demodulate_mfsk_symbols(np.concatenate(batch), config)
+        encoded = _symbols_to_byte_array(
+            demod_symbols.reshape(len(batch), -1), config.bits_per_symbol
+        )[:, :encoded_bytes_len]
+        messages, errors_corrected = RSC_BATCH.decode(encoded)
+        results += [
+            (
+                _parse_decoded_packet(message.tobytes(), int(rs_errors))
+                if rs_errors != -1
+                else (None, None, None, -1, False)
+            )
+            for message, rs_errors in zip(messages, errors_corrected)
+        ]
+    return results
 
 
-def receive_text_mfsk(
-    signal: np.ndarray, mode: str = "DEFAULT"
-) -> tuple[str, str, str, str]:
-    modes_to_try = [mode] + [m for m in MODEM_MODES if m != mode]
-    for current_mode_name in modes_to_try:
-        config = MODEM_MODES.get(current_mode_name)
+def _decode_modes(sync: _ChirpSync, mode_names):
+    """
+    Yields (mode name, packets, decode results) with every packet of a mode
+    decoded, most likely mode first.
+
+    Each mode is first probed on its first MODE_PROBE_PACKETS packets and only
+    a mode that passes the RS/CRC check there gets a full decode. Modes that
+    fail the probe are fully decoded afterwards as a fallback, e.g. when the
+    first packets of the right mode were lost to noise.
+    """
+    rejected = []
+    for mode_name in mode_names:
+        config = MODEM_MODES.get(mode_name)
         if not config:
             continue
-        current_signal_copy = np.copy(signal)
-        current_signal_copy, peaks, chirp_len, samples_per_packet = (
-            _synchronize_mfsk_signal(current_signal_copy, config)
+        samples_per_packet = _samples_per_packet(config)
+        peaks = _find_packet_peaks(sync, samples_per_packet)
+        packets = list(_packet_chunks(sync, peaks, samples_per_packet))
+        results = []
+        truncated = _truncated_packet(sync, samples_per_packet)
+        if truncated is not None:
+            (result,) = _demodulate_and_decode([truncated[1]], config)
+            if result[4]:
+                packets.insert(0, truncated)
+                results.append(result)
+        results += _demodulate_and_decode(
+            [chunk for _, chunk in packets[len(results) :][:MODE_PROBE_PACKETS]],
+            config,
         )
-        if not peaks:
-            continue
-        decoded_packets = {}
-        max_total_packets = 0
-        for peak_start in peaks:
-            packet_start = peak_start + chirp_len
-            packet_end = packet_start + samples_per_packet
-            if packet_end > len(current_signal_copy):
-                break
-            packet_chunk = current_signal_copy[packet_start:packet_end]
-            demod_bits_str = _demodulate_mfsk_symbols(packet_chunk, config)
-            decoded_packet_info = _decode_mfsk_packet(demod_bits_str, config)
-            payload, packet_num, total_packets, _, crc_ok = decoded_packet_info
-            if crc_ok and payload is not None:
-                if packet_num not in decoded_packets:
-                    decoded_packets[packet_num] = payload
-                if total_packets > max_total_packets:
-                    max_total_packets = total_packets
-            else:
-                # In strict decoding, we could break here. For robustness, we continue.
-                pass
-
-        # Check if we have a plausible set of packets
-        if decoded_packets and max_total_packets > 0:
-            # Heuristic: if we decoded at least one packet and have a total count, it's likely the right mode.
-            message_parts = [
-                decoded_packets.get(i, b"").rstrip(b"\x00")
-                for i in range(1, max_total_packets + 1)
-            ]
-            # Only consider it a success if we have at least one packet
-            if any(p != b"" for p in message_parts):
-                message = b"".join(message_parts)
-                return message.decode("utf-8", "ignore"), "", "", current_mode_name
-    return "[Could not detect modem mode or decode message]", "", "", ""
+        if any(crc_ok for *_, crc_ok in results):
+            results += _demodulate_and_decode(
+                [chunk for _, chunk in packets[len(results) :]], config
+            )
+            yield mode_name, packets, results
+        else:
+            rejected.append((mode_name, config, packets, results))
 
+    for mode_name, config, packets, results in rejected:
+        results += _demodulate_and_decode(
+            [chunk for _, chunk in packets[len(results) :]], config
+        )
+        yield mode_name, packets, results
 
-def analyze_signal(signal: np.ndarray) -> tuple[Optional[str], List[PacketAnalysis]]:
+
+class _StreamDecoder:
     """
-    Analyzes a signal for all modem modes and returns detailed packet information.
+    Incremental packet decoder for a continuous stream of samples. Samples
+    are appended with feed(), and each packet is decoded as soon as all of
+    its samples have arrived. Samples before it are then dropped, so memory
+    stays bounded by about two packets however long the stream runs.
     """
-    for mode_name, config in MODEM_MODES.items():
-        analysis_results = []
-        current_signal_copy = np.copy(signal)
-        current_signal_copy, peaks, chirp_len, samples_per_packet = (
-            _synchronize_mfsk_signal(current_signal_copy, config)
+
+    def __init__(self, mode: str = "DEFAULT"):
+        self.mode = mode
+        # Mode of the message being received, for legacy preambles that do
+        # not name it; cleared by the caller when the message is complete
+        self.locked_mode: Optional[str] = None
+        self._chirp_len = int(SAMPLE_RATE * PACKET_CHIRP_DURATION)
+        # Chirps are searched for in windows of two of the longest packets,
+        # so the one found first is never preceded by another one
+        self._window_len = 2 * max(
+            _packet_signal_length(c) for c in MODEM_MODES.values()
         )
+        self._buffer = np.zeros(0)
+        self._offset = 0  # Stream position of self._buffer[0]
+        self._unsearched = 0  # Samples appended since the last chirp search
+        self._failed_at: Optional[int] = None
+        self._failed_modes: set = set()
+        self._waiting_at: Optional[int] = None
 
-        if not peaks:
-            continue
+    @property
+    def buffered_samples(self) -> int:
+        return len(self._buffer)
+
+    def feed(
+        self, samples: np.ndarray
+    ) -> List[Tuple[int, Optional[str], Optional[Tuple[Optional[bytes], ...]]]]:
+        """
+        Appends samples and returns (stream position of the chirp, mode name,
+        decode result) for every packet they complete. The mode name is None
+        for a chirp at which no mode decoded. A chirp whose packet is still
+        arriving is reported once with a result of None.
+        """
+        samples = np.asarray(samples, dtype=np.float64)
+        if samples.ndim == 2:
+            samples = samples.mean(axis=1)
+        self._buffer = np.concatenate([self._buffer, samples])
+        self._unsearched += len(samples)
+        packets = []
+        # The correlation only changes once at least a chirp length arrived
+        while self._unsearched >= self._chirp_len:
+            packet = self._next_packet()
+            if packet is not None:
+                packets.append(packet)
+        return packets
 
-        for i, peak_start in enumerate(peaks):
-            packet_start = peak_start + chirp_len
-            packet_end = packet_start + samples_per_packet
-            if packet_end > len(current_signal_copy):
-                break
+    def _discard(self, num_samples: int) -> None:
+        num_samples = max(0, num_samples)
+        self._buffer = self._buffer[num_samples:]
+        self._offset += num_samples
+        # Whatever is left is searched again
+        self._unsearched = len(self._buffer)
 
-            packet_chunk = current_signal_copy[packet_start:packet_end]
-            demod_bits_str = _demodulate_mfsk_symbols(packet_chunk, config)
+    def _candidate_modes(self, signalled_mode: Optional[str]) -> List[str]:
+        if signalled_mode:
+            return [signalled_mode]
+        first_mode = self.locked_mode or self.mode
+        return [first_mode] + [m for m in MODEM_MODES if m != first_mode]
 
-            _, packet_num, total_packets, rs_errors, crc_ok = _decode_mfsk_packet(
-                demod_bits_str, config, analyze_mode=True
+    def _next_packet(self):
+        """
+        Decodes the first packet in the buffer if it is complete. Returns
+        None if there is none or it is still arriving; in the latter case
+        _unsearched is reset so feed() waits for more samples.
+        """
+        window = self._buffer[: self._window_len]
+        sync = _sync_chirps(window, earliest=True)
+        # A stream is mostly noise between transmissions, and noise alone
+        # regularly clears the absolute threshold once it is normalized; a
+        # real chirp stands far above the spread of the correlation.
+        if sync.first_peak is not None and sync.correlation[
+            sync.first_peak
+        ] < STREAM_SYNC_MIN_PEAK_RATIO * np.std(sync.correlation):
+            sync.first_peak = None
+        if sync.first_peak is None:
+            # Keep the tail: a chirp that has not fully arrived is not visible yet
+            self._discard(len(window) - self._chirp_len)
+            if len(self._buffer) < self._window_len:
+                self._unsearched = 0
+            return None
+
+        position = self._offset + sync.first_peak
+        if self._failed_at != position:
+            self._failed_at, self._failed_modes = position, set()
+        packet_start = sync.first_peak + self._chirp_len
+        result = None
+        for mode_name in self._candidate_modes(sync.mode_name):
+            if mode_name in self._failed_modes:
+                continue
+            config = MODEM_MODES[mode_name]
+            packet_end = packet_start + _samples_per_packet(config)
+            if packet_end > len(window):
+                if len(window) < len(self._buffer):
+                    # The packet runs past the window: search again from its chirp
+                    self._discard(sync.first_peak)
+                    return None
+                self._unsearched = 0  # Wait for the rest of the packet
+                if self._waiting_at == position:
+                    return None
+                self._waiting_at = position
+                return position, sync.mode_name, None
+            (result,) = _demodulate_and_decode(
+                [sync.signal[packet_start:packet_end]], config
             )
+            if result[4]:
+                if sync.mode_name is None:
+                    self.locked_mode = mode_name
+                self._discard(packet_end)
+                return position, mode_name, result
+            self._failed_modes.add(mode_name)
 
-            analysis_results.append(
-                PacketAnalysis(
-                    packet_index=i + 1,
-                    found_at_s=peak_start / SAMPLE_RATE,
-                    rs_decode_success=(rs_errors != -1),
-                    rs_errors_corrected=rs_errors if rs_errors != -1 else 0,
-                    crc_valid=crc_ok,
-                    packet_num=packet_num,
-                    total_packets=total_packets,
-                )
+        # No mode decodes at this chirp (noise or a damaged packet): skip it
+        self._discard(packet_start)
+        return position, None, result or (None, None, None, -1, False)
+
+
+def _assemble_message(packet_results) -> Optional[str]:
+    """Joins the payloads of all CRC-valid packets, or None if there are none."""
+    decoded_packets = {}
+    max_total_packets = 0
+    for payload, packet_num, total_packets, _, crc_ok in packet_results:
+        if crc_ok and payload is not None:
+            if packet_num not in decoded_packets:
+                decoded_packets[packet_num] = payload
+            if total_packets > max_total_packets:
+                max_total_packets = total_packets
+
+    # Check if we have a plausible set of packets
+    if decoded_packets and max_total_packets > 0:
+        # Heuristic: if we decoded at least one packet and have a total count, it's likely the right mode.
+        message_parts = [
+            decoded_packets.get(i, b"").rstrip(b"\x00")
+            for i in range(1, max_total_packets + 1)
+        ]
+        # Only consider it a success if we have at least one packet
+        if any(p != b"" for p in message_parts):
+            return b"".join(message_parts).decode("utf-8", "ignore")
+    return None
+
+
+@dataclass
+class PacketFound:
+    """A preamble chirp was detected; its packet may still be arriving."""
+
+    position: int  # Stream position of the chirp, in samples
+    mode_name: Optional[str]  # None for legacy chirps, which do not name the mode
+
+
+@dataclass
+class PacketDecoded:
+    """A packet was decoded and its CRC is valid."""
+
+    position: int
+    mode_name: str
+    packet_num: int
+    total_packets: int
+    rs_errors_corrected: int
+    payload: bytes
+
+
+@dataclass
+class CRCFailure:
+    """No mode decoded the packet at this chirp with a valid CRC."""
+
+    position: int
+    rs_errors_corrected: int  # -1 if Reed-Solomon decoding failed
+
+
+@dataclass
+class MessageComplete:
+    """All packets of a message have been decoded."""
+
+    position: int  # Of the chirp of the packet completing the message
+    mode_name: str
+    text: str
+    total_packets: int
+
+
+ReceiverEvent = Union[PacketFound, PacketDecoded, CRCFailure, MessageComplete]
+
+
+class StreamReceiver:
+    """
+    Stateful receiver for a continuous stream of samples, e.g. from a
+    microphone or a websocket. feed() takes the next chunk of samples and
+    yields an event for every chirp found, packet decoded or CRC failure, and
+    for every message whose packets have all arrived. Each chunk is only
+    searched together with a carry-over of at most two packets, so the cost
+    per chunk does not grow with the length of the stream.
+
+    A message is assembled from its packets by packet number; a packet that
+    announces a different number of packets starts a new message.
+    """
+
+    def __init__(self, mode: str = "DEFAULT"):
+        self.mode = mode
+        self._decoder = _StreamDecoder(mode)
+        self._reported_at: Optional[int] = None
+        self._reset_message()
+
+    def _reset_message(self) -> None:
+        # Keyed by packet number, so a message that is repeated but never
+        # completes keeps at most one result per packet
+        self._packet_results: Dict[int, Tuple] = {}
+        self._total_packets = 0
+
+    @property
+    def buffered_samples(self) -> int:
+        """Number of samples carried over to the next feed() call."""
+        return self._decoder.buffered_samples
+
+    def partial_message(self) -> Optional[str]:
+        """The text of the packets received so far of an incomplete message."""
+        return _assemble_message(self._packet_results.values())
+
+    def feed(self, samples: np.ndarray) -> Iterator[ReceiverEvent]:
+        """Appends mono (or multi-channel) samples and yields the new events."""
+        for position, mode_name, result in self._decoder.feed(samples):
+            if position != self._reported_at:
+                self._reported_at = position
+                yield PacketFound(position, mode_name)
+            if result is None:
+                continue
+            payload, packet_num, total_packets, rs_errors, crc_ok = result
+            if not crc_ok:
+                yield CRCFailure(position, rs_errors)
+                continue
+            yield PacketDecoded(
+                position, mode_name, packet_num, total_packets, rs_errors, payload
             )
+            if total_packets != self._total_packets:
+                # Packet count changed: a new message has started
+                self._reset_message()
+                self._total_packets = total_packets
+            self._packet_results[packet_num] = result
+            if len(self._packet_results) >= total_packets:
+                text = _assemble_message(self._packet_results.values())
+                self._reset_message()
+                self._decoder.locked_mode = None
+                yield MessageComplete(position, mode_name, text, total_packets)
+
+
+def receive_text_mfsk(
+    signal: np.ndarray, mode: str = "DEFAULT"
+) -> tuple[str, str, str, str]:
+    failure = "[Could not detect modem mode or decode message]", "", "", ""
+    # Normalization and chirp correlation do not depend on the mode, so they
+    # are done once; each mode only walks the peaks with its own packet spacing.
+    sync = _sync_chirps(signal)
+    if sync.first_peak is None:
+        return failure
+    # A mode-signalling preamble names the mode; the legacy preamble leaves
+    # the caller's mode as the first guess. The rest are only a fallback.
+    first_mode = sync.mode_name or mode
+    modes_to_try = [first_mode] + [m for m in MODEM_MODES if m != first_mode]
+    for current_mode_name, _, packet_results in _decode_modes(sync, modes_to_try):
+        message = _assemble_message(packet_results)
+        if message is not None:
+            return message, "", "", current_mode_name
+    return failure
+
+
+def _packet_analysis(
+    packet_index: int, peak_start: int, packet_info: tuple
+) -> PacketAnalysis:
+    _, packet_num, total_packets, rs_errors, crc_ok = packet_info
+    return PacketAnalysis(
+        packet_index=packet_index,
+        # A recovered packet whose chirp was cut off starts before the recording
+        found_at_s=max(peak_start, 0) / SAMPLE_RATE,
+        rs_decode_success=(rs_errors != -1),
+        rs_errors_corrected=rs_errors if rs_errors != -1 else 0,
+        crc_valid=crc_ok,
+        packet_num=packet_num,
+        total_packets=total_packets,
+    )
+
+
+def analyze_signal(signal: np.ndarray) -> tuple[Optional[str], List[PacketAnalysis]]:
+    """
+    Analyzes a signal for all modem modes and returns detailed packet information.
+    """
+    sync = _sync_chirps(signal)
+    if sync.first_peak is None:
+        return None, []
+
+    modes_to_try = list(MODEM_MODES)
+    if sync.mode_name:
+        modes_to_try.remove(sync.mode_name)
+        modes_to_try.insert(0, sync.mode_name)
+    for mode_name, packets, packet_results in _decode_modes(sync, modes_to_try):
+        analysis_results = [
+            _packet_analysis(i + 1, peak_start, packet_info)
+            for i, ((peak_start, _), packet_info) in enumerate(
+                zip(packets, packet_results)
+            )
+        ]
 
         # If we found any packets with a valid CRC, we assume this is the correct mode
         if any(r.crc_valid for r in analysis_results):
             return mode_name, analysis_results
 
     return None, []
+
+
+def _decode_file_blocks(path: str, mode: str = "DEFAULT"):
+    """
+    Reads a recording in windows that overlap by the longest packet and
+    decodes each window on its own, so memory use does not depend on the
+    length of the recording. Yields (mode name, [(peak sample, decode
+    result), ...]) for every window in which a mode decodes.
+
+    Every packet lies completely inside at least one window. A window only
+    reports the packets that start before the next window does, so each
+    packet is reported once. The first mode that decodes is kept for the
+    rest of the file.
+    """
+    overlap = max(_packet_signal_length(c) for c in MODEM_MODES.values())
+    blocksize = max(int(BLOCK_DECODE_SECONDS * SAMPLE_RATE), 2 * overlap)
+    step = blocksize - overlap
+    detected_mode = None
+    with sf.SoundFile(path) as recording:
+        frames = recording.frames
+        # Later windows would lie completely inside the previous one
+        for offset in range(0, max(frames - overlap, 1), step):
+            recording.seek(offset)
+            sync = _sync_chirps(recording.read(blocksize))
+            if sync.first_peak is None:
+                continue
+            owned_until = offset + step if offset + blocksize < frames else frames
+            if detected_mode:
+                modes_to_try = [detected_mode]
+            else:
+                first_mode = sync.mode_name or mode
+                modes_to_try = [first_mode] + [
+                    m for m in MODEM_MODES if m != first_mode
+                ]
+            for mode_name, packets, results in _decode_modes(sync, modes_to_try):
+                if any(crc_ok for *_, crc_ok in results):
+                    detected_mode = mode_name
+                    yield mode_name, [
+                        (offset + peak_start, packet_info)
+                        for (peak_start, _), packet_info in zip(packets, results)
+                        # Negative peaks were cut off and belong to the previous window
+                        if (peak_start >= 0 or offset == 0)
+                        and offset + peak_start < owned_until
+                    ]
+                    break
+
+
+def receive_file_mfsk(path: str, mode: str = "DEFAULT") -> tuple[str, str, str, str]:
+    """
+    Block-wise counterpart of receive_text_mfsk for long recordings: decodes
+    the file window by window and merges the packets by packet number.
+    Reading stops as soon as every packet of the message has been received.
+    """
+    packet_results = []
+    received_packets = set()
+    total_packets = 0
+    detected_mode = ""
+    for detected_mode, packets in _decode_file_blocks(path, mode):
+        for _, packet_info in packets:
+            packet_results.append(packet_info)
+            _, packet_num, packet_total, _, crc_ok = packet_info
+            if crc_ok:
+                received_packets.add(packet_num)
+                total_packets = max(total_packets, packet_total)
+        if total_packets and len(received_packets) >= total_packets:
+            break
+
+    message = _assemble_message(packet_results)
+    if message is None:
+        return "[Could not detect modem mode or decode message]", "", "", ""
+    return message, "", "", detected_mode
+
+
+def analyze_file(path: str) -> tuple[Optional[str], List[PacketAnalysis]]:
+    """Block-wise counterpart of analyze_signal for long recordings."""
+    detected_mode = None
+    analysis_results = []
+    for detected_mode, packets in _decode_file_blocks(path):
+        analysis_results += [
+            _packet_analysis(len(analysis_results) + i + 1, peak_start, packet_info)
+            for i, (peak_start, packet_info) in enumerate(packets)
+        ]
+    return detected_mode, analysis_results
@@ -0,0 +1,114 @@
+import io
+import subprocess
+from unittest.mock import patch
+import numpy as np
+import pytest
+import soundfile as sf
+from backend.audio_io import (
+    SNIFF_BYTES,
+    AudioTooLong,
+    read_audio,
+    sniff_audio_format,
+)
+from backend.config import SAMPLE_RATE
+
+
+def _encode(samples, audio_format, subtype=None):
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, SAMPLE_RATE, format=audio_format, subtype=subtype)
+    return buffer.getvalue()
+
+
+def _ffmpeg_result(samples, sample_rate):
+    """What ffmpeg writes to a pipe: a float WAV with its chunk sizes unset."""
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format="WAV", subtype="FLOAT")
+    wav = bytearray(buffer.getvalue())
+    wav[4:8] = b"\xff" * 4
+    data = wav.index(b"data")
+    wav[data + 4 : data + 8] = b"\xff" * 4
+    return subprocess.CompletedProcess([], 0, stdout=bytes(wav), stderr=b"")
+
+
+@pytest.mark.parametrize(
+    "audio_format,subtype",
+    [("WAV", "PCM_16"), ("FLAC", None), ("OGG", "VORBIS"), ("AIFF", None)],
+)
+def test_libsndfile_formats_are_read_without_ffmpeg(audio_format, subtype):
+    """Formats libsndfile knows are sniffed and read directly."""
+    samples = np.sin(np.arange(SAMPLE_RATE) * 0.05) * 0.5
+    audio_bytes = _encode(samples, audio_format, subtype)
+    assert sniff_audio_format(audio_bytes[:SNIFF_BYTES]) == audio_format
+    with patch("backend.audio_io.subprocess.run") as run:
+        signal, sample_rate = read_audio(audio_bytes)
+    run.assert_not_called()
+    assert sample_rate == SAMPLE_RATE
+    assert len(signal) == len(samples)
+    # Lossy Vorbis only approximates the samples
+    np.testing.assert_allclose(signal, samples, atol=0.05)
+
+
+@pytest.mark.parametrize(
+    "header,audio_format",
+    [
+        (b"ID3\x04\x00\x00\x00\x00\x00\x00\x00\x00", "MP3"),
+        (b"\xff\xfb\x90\x64\x00\x00\x00\x00\x00\x00\x00\x00", "MP3"),
+        (b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01\x42\xf7\x81", "WEBM"),
+        (b"\x00\x00\x00\x20ftypM4A \x00\x00", "MP4"),
+        (b"not audio at all", None),
+    ],
+)
+def test_other_formats_are_decoded_with_ffmpeg(header, audio_format):
+    assert sniff_audio_format(header[:SNIFF_BYTES]) == audio_format
+    stereo = np.array([[0, 0.5], [-1, 0]], dtype=np.float32)
+    with patch("backend.audio_io.subprocess.run") as run:
+        run.return_value = _ffmpeg_result(stereo, 44100)
+        signal, sample_rate = read_audio(header)
+    # One ffmpeg run, fed the contents on stdin, and no separate probe
+    run.assert_called_once()
+    assert run.call_args.kwargs["input"] == header
+    assert "-t" not in run.call_args.args[0]
+    # Stereo is mixed down to mono
+    np.testing.assert_array_equal(signal, [0.25, -0.5])
+    assert sample_rate == 44100
+
+
+def test_ffmpeg_errors_are_raised():
+    with patch("backend.audio_io.subprocess.run") as run:
+        run.return_value = subprocess.CompletedProcess(
+            [], 1, stdout=b"", stderr=b"Invalid data found when processing input"
+        )
+        with pytest.raises(ValueError, match="Invalid data"):
+            read_audio(b"not audio at all")
+
+
+def test_long_audio_is_refused_before_reading(tmp_path):
+    """The duration is checked from the header, for contents and paths alike."""
+    path = str(tmp_path / "long.flac")
+    sf.write(path, np.zeros((SAMPLE_RATE * 3, 2)), SAMPLE_RATE)
+    with open(path, "rb") as f:
+        audio_bytes = f.read()
+    for source in (path, audio_bytes):
+        with pytest.raises(AudioTooLong):
+            read_audio(source, max_seconds=2)
+        signal, _ = read_audio(source, max_seconds=3)
+        # Stereo is mixed down to mono float32
+        assert signal.shape == (SAMPLE_RATE * 3,)
+        assert signal.dtype == np.float32
+
+
+@pytest.mark.parametrize("seconds,too_long", [(3, False), (4, True)])
+def test_ffmpeg_decodes_little_more_than_the_limit(seconds, too_long):
+    """ffmpeg is told to stop past the limit; reaching that cut refuses the file."""
+    rate = 1000
+    with patch("backend.audio_io.subprocess.run") as run:
+        run.return_value = _ffmpeg_result(np.zeros(rate * seconds), rate)
+        if too_long:
+            with pytest.raises(AudioTooLong):
+                read_audio(b"ID3" + bytes(100), max_seconds=3)
+        else:
+            signal, _ = read_audio(b"ID3" + bytes(100), max_seconds=3)
+            assert len(signal) == rate * seconds
+    run.assert_called_once()
+    command = run.call_args.args[0]
+    assert float(command[command.index("-t") + 1]) == 4
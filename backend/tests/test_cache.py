@@ -0,0 +1,96 @@
+import numpy as np
+import backend.cache as cache
+from backend.cache import DecodeCache, GeneratedSignalCache
+
+
+def test_key_depends_on_samples_and_mode():
+    samples = np.arange(100, dtype=np.float32)
+    key = DecodeCache.key(samples, "DEFAULT")
+    assert key == DecodeCache.key(samples.copy(), "DEFAULT")
+    assert key != DecodeCache.key(samples, "FAST")
+    assert key != DecodeCache.key(samples[::-1], "DEFAULT")
+    assert key != DecodeCache.key(samples.astype(np.float64), "DEFAULT")
+
+
+def test_least_recently_used_entry_is_evicted():
+    decode_cache = DecodeCache(max_entries=2)
+    decode_cache.put("a", ("text a", "FAST"))
+    decode_cache.put("b", ("text b", "FAST"))
+    assert decode_cache.get("a") == ("text a", "FAST")
+    decode_cache.put("c", ("text c", "FAST"))
+    assert decode_cache.get("b") is None
+    assert decode_cache.get("a") is not None
+    assert decode_cache.stats() == {"hits": 2, "misses": 1}
+
+
+def test_entries_expire_after_ttl(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    decode_cache = DecodeCache(max_entries=2, ttl=60, disk_dir=str(tmp_path))
+    decode_cache.put("a", ("text", "DEFAULT"))
+    now[0] += 59
+    assert decode_cache.get("a") == ("text", "DEFAULT")
+    now[0] += 2
+    # Neither the memory nor the disk copy is used any more
+    assert decode_cache.get("a") is None
+
+
+def test_disk_tier_is_shared_and_bounded(tmp_path):
+    first = DecodeCache(max_entries=1, disk_dir=str(tmp_path), max_disk_entries=2)
+    second = DecodeCache(max_entries=1, disk_dir=str(tmp_path), max_disk_entries=2)
+    first.put("a", ("text a", "ROBUST"))
+    # Another process, e.g. a different worker, finds the entry on disk
+    assert second.get("a") == ("text a", "ROBUST")
+    first.put("b", ("text b", "ROBUST"))
+    first.put("c", ("text c", "ROBUST"))
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_unwritable_disk_tier_is_skipped(monkeypatch, tmp_path, caplog):
+    decode_cache = DecodeCache(max_entries=2, disk_dir=str(tmp_path))
+
+    def replace(src, dst):
+        raise PermissionError(13, "Permission denied", dst)
+
+    monkeypatch.setattr(cache.os, "replace", replace)
+    decode_cache.put("a", ("text a", "FAST"))
+    # The temporary file is removed, and the entry is still cached in memory
+    assert list(tmp_path.iterdir()) == []
+    assert decode_cache.get("a") == ("text a", "FAST")
+    assert "Could not write decode cache entry" in caplog.text
+
+
+def test_missing_disk_dir_is_skipped(tmp_path):
+    disk_dir = tmp_path / "cache"
+    decode_cache = DecodeCache(max_entries=2, disk_dir=str(disk_dir))
+    # E.g. removed by a cleanup job and replaced by a file
+    disk_dir.rmdir()
+    disk_dir.write_text("")
+    decode_cache.put("a", ("text a", "FAST"))
+    assert decode_cache.get("a") == ("text a", "FAST")
+    assert decode_cache.get("b") is None
+
+
+def test_malformed_disk_entries_are_misses(tmp_path, caplog):
+    decode_cache = DecodeCache(max_entries=2, disk_dir=str(tmp_path))
+    (tmp_path / "truncated.json").write_text('{"stored_at": 1')
+    (tmp_path / "list.json").write_text("[1, 2]")
+    (tmp_path / "no_value.json").write_text('{"stored_at": 1}')
+    (tmp_path / "bad_time.json").write_text('{"stored_at": "x", "value": 1}')
+    for key in ("truncated", "list", "no_value", "bad_time"):
+        assert decode_cache.get(key) is None
+    assert decode_cache.stats() == {"hits": 0, "misses": 4}
+    assert "malformed decode cache entry" in caplog.text
+
+
+def test_generated_signal_cache_is_bounded_by_size():
+    signals = GeneratedSignalCache(max_bytes=10)
+    signals.put("a", b"12345")
+    signals.put("b", b"12345")
+    assert signals.get("a") is not None
+    signals.put("c", b"123")
+    assert signals.get("b") is None
+    assert signals.get("a") == b"12345"
+    # Files larger than the whole cache are not kept
+    signals.put("d", b"x" * 11)
+    assert signals.get("d") is None
@@ -8,11 +8,16 @@ from unittest.mock import patch, mock_open
 import numpy as np
 
 # Import from the new config location
-from backend.config import MODEM_MODES, SAMPLE_RATE, ModemConfig
+from backend.config import (
+    MODEM_MODES,
+    SAMPLE_RATE,
+    BLOCK_DECODE_MIN_SECONDS,
+    ModemConfig,
+)
 
 # Import the app and PacketAnalysis (which is not config)
 from cli import app
-from backend.modem_mfsk import PacketAnalysis
+from backend.modem_mfsk import MessageComplete, PacketAnalysis, PacketDecoded
 
 
 runner = CliRunner()
@@ -26,8 +31,11 @@ def mock_external_dependencies():
         patch("cli.sf") as mock_sf,
         patch("builtins.open", new_callable=mock_open),
         patch("cli.send_text_mfsk") as mock_send_text_mfsk,
+        patch("cli.send_file_mfsk") as mock_send_file_mfsk,
         patch("cli.receive_text_mfsk") as mock_receive_text_mfsk,
+        patch("cli.receive_file_mfsk") as mock_receive_file_mfsk,
         patch("cli.analyze_signal") as mock_analyze_signal,
+        patch("cli.analyze_file") as mock_analyze_file,
     ):
         # Configure mocks
         mock_sd.rec.return_value = np.ones(
@@ -37,6 +45,8 @@ def mock_external_dependencies():
         mock_sd.play.return_value = None
 
         mock_sf.read.return_value = (np.ones(SAMPLE_RATE * 5), SAMPLE_RATE)
+        mock_sf.info.return_value.frames = SAMPLE_RATE * 5
+        mock_sf.info.return_value.samplerate = SAMPLE_RATE
         mock_sf.write.return_value = None
 
         # Default return for modem functions
@@ -45,9 +55,12 @@ def mock_external_dependencies():
         mock_sf.write(mock_buffer, np.zeros(1000), SAMPLE_RATE, format="WAV")
         mock_buffer.seek(0)
         mock_send_text_mfsk.return_value = mock_buffer
+        mock_send_file_mfsk.return_value = 1
 
         mock_receive_text_mfsk.return_value = ("decoded message", None, None, "DEFAULT")
         mock_analyze_signal.return_value = ("DEFAULT", [])
+        mock_receive_file_mfsk.return_value = ("decoded message", "", "", "DEFAULT")
+        mock_analyze_file.return_value = ("DEFAULT", [])
 
         yield  # This yields control to the test function
 
@@ -92,14 +105,71 @@ def test_send_from_file_and_save_to_file():
         assert "Reading message from 'input.txt'" in result.stdout
 
 
+def test_send_from_file_streams_to_output():
+    """Files are encoded from disk by send_file_mfsk, not read into a string."""
+    with patch("cli.send_file_mfsk") as mock_send_file_mfsk:
+        result = run_command("send", "--from-file", "input.txt", "-o", "test.wav")
+        assert result.exit_code == 0
+        mock_send_file_mfsk.assert_called_once_with(
+            "input.txt", "test.wav", mode="DEFAULT", audio_format="WAV"
+        )
+
+
+def test_send_format_sets_default_output_name():
+    with patch("cli.send_file_mfsk") as mock_send_file_mfsk:
+        result = run_command("send", "--from-file", "input.txt", "--format", "flac")
+        assert result.exit_code == 0
+        mock_send_file_mfsk.assert_called_once_with(
+            "input.txt", "modem_signal.flac", mode="DEFAULT", audio_format="FLAC"
+        )
+
+
+def test_send_error_invalid_format():
+    with patch("cli.typer.secho") as mock_secho:
+        result = run_command("send", "test", "--format", "MP3")
+        assert result.exit_code == 1
+        mock_secho.assert_any_call(
+            "Error: Invalid format 'MP3'. Please choose from ['WAV', 'FLAC', 'OGG'].",
+            fg=typer.colors.RED,
+        )
+
+
+def test_send_from_file_too_large():
+    with (
+        patch("cli.typer.secho") as mock_secho,
+        patch("cli.send_file_mfsk", side_effect=ValueError("too many packets")),
+    ):
+        result = run_command("send", "--from-file", "input.txt")
+        assert result.exit_code == 1
+        mock_secho.assert_any_call("Error: too many packets", fg=typer.colors.RED)
+
+
 def test_send_live_mode():
-    with patch("cli.typer.secho") as mock_secho, patch("cli.sd.play") as mock_sd_play:
+    with (
+        patch("cli.typer.secho") as mock_secho,
+        patch("cli.LiveTransmitter") as mock_transmitter,
+        patch("cli.send_text_mfsk") as mock_send_text_mfsk,
+    ):
         result = run_command("send", "live test", "--live")
         assert result.exit_code == 0
-        mock_sd_play.assert_called_once()
+        assert mock_transmitter.call_args.args == ("live test",)
+        assert mock_transmitter.call_args.kwargs["mode"] == "DEFAULT"
+        mock_transmitter.return_value.wait.assert_called_once()
+        # Played straight from the packet signals, without a WAV file
+        mock_send_text_mfsk.assert_not_called()
         mock_secho.assert_any_call("Playback complete.", fg=typer.colors.GREEN)
 
 
+def test_send_live_mode_message_too_long():
+    with (
+        patch("cli.typer.secho") as mock_secho,
+        patch("cli.LiveTransmitter", side_effect=ValueError("too many packets")),
+    ):
+        result = run_command("send", "live test", "--live")
+        assert result.exit_code == 1
+        mock_secho.assert_any_call("Error: too many packets", fg=typer.colors.RED)
+
+
 def test_send_expert_mode_success():
     # We need to create a mock buffer for this specific test case
     mock_buffer = io.BytesIO()
@@ -203,8 +273,9 @@ def test_send_error_expert_mode_invalid_num_tones():
 def test_send_error_playback_failure():
     with (
         patch("cli.typer.secho") as mock_secho,
-        patch("cli.sd.play", side_effect=Exception("Playback error")),
+        patch("cli.LiveTransmitter") as mock_transmitter,
     ):
+        mock_transmitter.return_value.wait.side_effect = Exception("Playback error")
         result = run_command("send", "test", "--live")
         assert result.exit_code == 1
         mock_secho.assert_any_call(
@@ -264,20 +335,75 @@ def test_receive_from_file_and_save_to_file():
         )
 
 
+class FakeLiveReceiver:
+    """Stands in for LiveReceiver, reporting the given messages on start."""
+
+    def __init__(self, messages=(), partial=None):
+        self.messages = messages
+        self.partial = partial
+
+    def __call__(self, on_event, stream_factory):
+        self.on_event = on_event
+        self.ring = type("Ring", (), {"dropped": 0})()
+        return self
+
+    def __enter__(self):
+        for text, mode_name in self.messages:
+            self.on_event(PacketDecoded(0, mode_name, 1, 1, 0, text.encode()))
+            self.on_event(MessageComplete(0, mode_name, text, 1))
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def partial_message(self):
+        return self.partial
+
+
 def test_receive_live_success():
     with (
         patch("cli.typer.secho") as mock_secho,
-        patch("cli.sd.rec", return_value=np.ones(SAMPLE_RATE * 5)),
-        patch(
-            "cli.receive_text_mfsk",
-            return_value=("live decoded", None, None, "DEFAULT"),
-        ),
+        patch("cli.LiveReceiver", FakeLiveReceiver([("live decoded", "DEFAULT")])),
+        patch("cli.time.sleep") as mock_sleep,
     ):
         result = run_command("receive", "--live", "--duration", "1")
         assert result.exit_code == 0
         mock_secho.assert_any_call("Decoded Message:", fg=typer.colors.CYAN)
         assert "live decoded" in result.stdout
-        assert "Recording for 1 seconds..." in result.stdout
+        assert "Received packet 1 of 1 (DEFAULT)" in result.stdout
+        assert "Listening for 1 seconds..." in result.stdout
+        mock_sleep.assert_called_once_with(1)
+
+
+def test_receive_live_until_interrupted():
+    with (
+        patch("cli.typer.secho") as mock_secho,
+        patch("cli.LiveReceiver", FakeLiveReceiver(partial="half a mess")),
+        patch("cli.time.sleep", side_effect=[None, KeyboardInterrupt]),
+    ):
+        result = run_command("receive", "--live")
+        assert result.exit_code == 0
+        assert "Press Ctrl+C to stop." in result.stdout
+        assert "Stopped listening." in result.stdout
+        mock_secho.assert_any_call(
+            "Incomplete message received:", fg=typer.colors.YELLOW
+        )
+        assert "half a mess" in result.stdout
+
+
+def test_receive_live_nothing_decoded():
+    with (
+        patch("cli.typer.secho") as mock_secho,
+        patch("cli.LiveReceiver", FakeLiveReceiver()),
+        patch("cli.time.sleep"),
+    ):
+        result = run_command("receive", "--live", "--duration", "1")
+        assert result.exit_code == 1
+        mock_secho.assert_any_call(
+            "Failed to decode the message. The signal may be too noisy "
+            "or not a valid modem signal.",
+            fg=typer.colors.RED,
+        )
 
 
 def test_receive_error_no_input():
@@ -338,6 +464,25 @@ def test_receive_warning_sample_rate_mismatch():
         )
 
 
+def test_receive_long_recording_is_decoded_block_wise():
+    long_frames = (BLOCK_DECODE_MIN_SECONDS + 1) * SAMPLE_RATE
+    with (
+        patch("cli.sf.info") as mock_info,
+        patch(
+            "cli.receive_file_mfsk",
+            return_value=("long decoded", "", "", "ROBUST"),
+        ) as mock_receive_file,
+        patch("cli.sf.read") as mock_read,
+    ):
+        mock_info.return_value.frames = long_frames
+        mock_info.return_value.samplerate = SAMPLE_RATE
+        result = run_command("receive", "field.wav")
+        assert result.exit_code == 0
+        mock_receive_file.assert_called_once_with("field.wav")
+        mock_read.assert_not_called()
+        assert "long decoded" in result.stdout
+
+
 # --- Test `analyze` command ---
 def test_analyze_success():
     mock_analysis_results = [
@@ -369,6 +514,20 @@ def test_analyze_success():
         assert "  - Header: Packet 1 of 1" in result.stdout
 
 
+def test_analyze_long_recording_block_wise():
+    with (
+        patch("cli.sf.info") as mock_info,
+        patch("cli.analyze_file", return_value=("FAST", [])) as mock_analyze_file,
+        patch("cli.sf.read") as mock_read,
+    ):
+        mock_info.return_value.frames = (BLOCK_DECODE_MIN_SECONDS + 1) * SAMPLE_RATE
+        mock_info.return_value.samplerate = SAMPLE_RATE
+        result = run_command("analyze", "field.wav")
+        assert result.exit_code == 0
+        mock_analyze_file.assert_called_once_with("field.wav")
+        mock_read.assert_not_called()
+
+
 def test_analyze_no_signal_detected():
     with (
         patch("cli.typer.secho") as mock_secho,
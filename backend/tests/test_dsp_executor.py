@@ -0,0 +1,84 @@
+import asyncio
+import os
+import time
+import pytest
+from backend.dsp_executor import (
+    DSPExecutor,
+    DSPQueueFull,
+    DSPWorkerLost,
+    decode_audio,
+    generate_audio,
+)
+
+
+@pytest.fixture
+def executor():
+    executor = DSPExecutor(max_workers=1, max_pending=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_generate_and_decode_in_worker(executor):
+    """Jobs run in the worker process and return their results."""
+
+    async def roundtrip():
+        wav_bytes = await executor.run(generate_audio, "Hello pool", "FAST")
+        return await executor.run(decode_audio, wav_bytes)
+
+    assert asyncio.run(roundtrip()) == ("Hello pool", "FAST")
+    assert executor.pending == 0
+
+
+def test_repeated_decode_is_answered_from_cache(executor):
+    """The same audio decoded twice is a cache hit, counted across workers."""
+
+    async def decode_twice():
+        wav_bytes = await executor.run(generate_audio, "Hello cache", "DEFAULT")
+        first = await executor.run(decode_audio, wav_bytes, "DEFAULT")
+        second = await executor.run(decode_audio, wav_bytes, "DEFAULT")
+        return first, second
+
+    first, second = asyncio.run(decode_twice())
+    assert first == second == ("Hello cache", "DEFAULT")
+    assert executor.cache_stats() == {"hits": 1, "misses": 1}
+
+
+def test_full_queue_is_refused(executor):
+    """Jobs beyond max_pending are refused instead of queued."""
+
+    async def overload():
+        slow_job = asyncio.ensure_future(executor.run(time.sleep, 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(DSPQueueFull):
+            await executor.run(time.sleep, 0)
+        await slow_job
+        # The slot is free again once the slow job is done
+        await executor.run(time.sleep, 0)
+
+    asyncio.run(overload())
+    assert executor.pending == 0
+
+
+def test_pool_is_replaced_after_a_worker_dies(executor):
+    """A killed worker only fails its own job; the next one gets a new pool."""
+
+    async def crash_then_generate():
+        with pytest.raises(DSPWorkerLost):
+            await executor.run(os._exit, 1)
+        return await executor.run(generate_audio, "Still here", "FAST")
+
+    wav_bytes = asyncio.run(crash_then_generate())
+    assert decode_audio(wav_bytes) == ("Still here", "FAST")
+    assert executor.pending == 0
+
+
+def test_session_holds_a_slot_while_open(executor):
+    """Live sessions run in this process but count towards max_pending."""
+    with executor.session():
+        assert executor.pending == 1
+        with pytest.raises(DSPQueueFull):
+            asyncio.run(executor.run(time.sleep, 0))
+        with pytest.raises(DSPQueueFull):
+            with executor.session():
+                pass
+    assert executor.pending == 0
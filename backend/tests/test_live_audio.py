@@ -0,0 +1,191 @@
+import threading
+import time
+import numpy as np
+import soundfile as sf
+from backend.config import SAMPLE_RATE
+from backend.live_audio import LiveReceiver, LiveTransmitter, RingBuffer
+from backend.modem_mfsk import (
+    MessageComplete,
+    PacketDecoded,
+    StreamReceiver,
+    send_text_mfsk,
+)
+
+
+class FakeInputStream:
+    """Stands in for sounddevice.InputStream, delivering a prepared signal."""
+
+    def __init__(self, signal, samplerate, channels, dtype, blocksize, callback):
+        self.signal = signal.astype(dtype)
+        self.blocksize = blocksize
+        self.callback = callback
+        self.finished = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._deliver)
+
+    def _deliver(self):
+        for start in range(0, len(self.signal), self.blocksize):
+            if self._stopped.is_set():
+                break
+            block = self.signal[start : start + self.blocksize]
+            self.callback(block[:, None], len(block), None, None)
+        self.finished.set()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def close(self):
+        pass
+
+
+class FakeOutputStream:
+    """Stands in for sounddevice.OutputStream, recording what is played."""
+
+    def __init__(self, samplerate, channels, dtype, blocksize, callback):
+        self.blocksize = blocksize
+        self.dtype = dtype
+        self.callback = callback
+        self.blocks = []
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._pull)
+
+    def _pull(self):
+        while not self._stopped.is_set():
+            outdata = np.full((self.blocksize, 1), np.nan, dtype=self.dtype)
+            self.callback(outdata, self.blocksize, None, None)
+            self.blocks.append(outdata[:, 0])
+            # Much faster than real time, but slower than modulation
+            time.sleep(0.001)
+
+    @property
+    def played(self):
+        return np.concatenate(self.blocks)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def close(self):
+        pass
+
+
+def _stream_factory(signal, streams):
+    def factory(**kwargs):
+        stream = FakeInputStream(signal, **kwargs)
+        streams.append(stream)
+        return stream
+
+    return factory
+
+
+def _output_factory(streams):
+    def factory(**kwargs):
+        stream = FakeOutputStream(**kwargs)
+        streams.append(stream)
+        return stream
+
+    return factory
+
+
+def _recording(text, mode, lead_in=SAMPLE_RATE, tail=SAMPLE_RATE):
+    signal, _ = sf.read(send_text_mfsk(text, mode=mode))
+    signal = np.concatenate([np.zeros(lead_in), signal, np.zeros(tail)])
+    return signal + np.random.default_rng(5).normal(0, 0.02, len(signal))
+
+
+def test_live_receiver_decodes_messages_from_stream():
+    """Packets and complete messages are reported while the stream runs."""
+    text = "Live reception test message spanning several packets."
+    signal = np.concatenate(
+        [_recording(text, "FAST"), _recording("second message", "DEFAULT")]
+    )
+    events, streams = [], []
+    receiver = LiveReceiver(
+        on_event=events.append, stream_factory=_stream_factory(signal, streams)
+    )
+    with receiver:
+        streams[0].finished.wait(timeout=30)
+    messages = [e for e in events if isinstance(e, MessageComplete)]
+    assert [(m.text, m.mode_name) for m in messages] == [
+        (text, "FAST"),
+        ("second message", "DEFAULT"),
+    ]
+    assert sum(isinstance(e, PacketDecoded) for e in events) == 3
+    assert receiver.ring.dropped == 0
+
+
+def test_live_receiver_reports_partial_message():
+    """Stopping mid-message leaves the packets received so far available."""
+    text = "x" * 32 + "y" * 32 + "z" * 32
+    signal, _ = sf.read(send_text_mfsk(text, mode="FAST"))
+    events, streams = [], []
+    receiver = LiveReceiver(
+        on_event=events.append, stream_factory=_stream_factory(signal[:-3000], streams)
+    )
+    with receiver:
+        streams[0].finished.wait(timeout=30)
+    assert not any(isinstance(e, MessageComplete) for e in events)
+    assert receiver.partial_message() == "x" * 32 + "y" * 32
+
+
+def test_ring_buffer_wraps_and_drops_oldest():
+    ring = RingBuffer(10)
+    ring.write(np.arange(6))
+    np.testing.assert_array_equal(ring.read(), np.arange(6))
+    ring.write(np.arange(6, 20))
+    np.testing.assert_array_equal(ring.read(), np.arange(10, 20))
+    assert ring.dropped == 4
+    assert len(ring.read(timeout=0)) == 0
+
+
+def test_stream_receiver_memory_is_bounded_on_noise():
+    """Listening to noise keeps neither samples nor false packets around."""
+    receiver = StreamReceiver()
+    rng = np.random.default_rng(2)
+    for _ in range(300):
+        assert list(receiver.feed(rng.normal(0, 0.01, 1600))) == []
+        assert receiver.buffered_samples <= 2 * 1600
+
+
+def test_live_transmitter_plays_the_message():
+    """The played samples are those of the generated WAV file, then silence."""
+    text = "Live transmission test message spanning several packets."
+    expected, _ = sf.read(send_text_mfsk(text, mode="FAST"))
+    streams = []
+    transmitter = LiveTransmitter(
+        text, mode="FAST", stream_factory=_output_factory(streams), blocksize=1000
+    )
+    with transmitter:
+        assert transmitter.wait(timeout=30)
+    played = streams[0].played
+    assert transmitter.underruns == 0
+    # Before the first packet is ready, the stream plays silence
+    start = np.flatnonzero(played)[0]
+    assert not played[:start].any()
+    np.testing.assert_allclose(
+        played[start : start + len(expected)], expected, atol=1.5 / 32767
+    )
+    assert not played[start + len(expected) :].any()
+
+
+def test_live_transmitter_stops_mid_message():
+    """Playback starts before the message is modulated and can be cut short."""
+    streams = []
+    transmitter = LiveTransmitter(
+        "z" * 32 * 500,
+        mode="FAST",
+        stream_factory=_output_factory(streams),
+        queue_packets=2,
+    )
+    with transmitter:
+        while not any(block.any() for block in streams[0].blocks):
+            time.sleep(0.01)
+    assert not transmitter.finished.is_set()
+    assert transmitter.total_packets == 500
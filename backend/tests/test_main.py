@@ -0,0 +1,375 @@
+import asyncio
+import io
+import json
+import tempfile
+import numpy as np
+import pytest
+import soundfile as sf
+from fastapi import UploadFile
+import backend.main as main
+from backend.config import SAMPLE_RATE, STREAMING_TEXT_THRESHOLD, WS_MAX_FRAME_SAMPLES
+from backend.main import app
+from backend.modem_mfsk import send_text_mfsk
+
+
+def _run_websocket(path, frames, query_string=b""):
+    """Drives the ASGI app through one websocket session and returns what it sent."""
+    incoming = [{"type": "websocket.connect"}]
+    incoming += [{"type": "websocket.receive", "bytes": frame} for frame in frames]
+    incoming.append({"type": "websocket.disconnect", "code": 1000})
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "websocket",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [],
+        "subprotocols": [],
+        "scheme": "ws",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+    }
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def test_ws_decode_pushes_packets_as_they_arrive():
+    """Each packet's text is pushed back before the message is complete."""
+    text = "Streaming over a websocket, packet by packet."
+    signal, _ = sf.read(send_text_mfsk(text, mode="FAST"))
+    samples = np.concatenate([np.zeros(SAMPLE_RATE), signal, np.zeros(4000)])
+    frames = [
+        samples[i : i + 4096].astype("<f4").tobytes()
+        for i in range(0, len(samples), 4096)
+    ]
+    sent = _run_websocket("/ws/decode", frames)
+
+    assert sent[0]["type"] == "websocket.accept"
+    events = [json.loads(message["text"]) for message in sent[1:]]
+    decoded = [e for e in events if e["event"] == "packet_decoded"]
+    assert [e["packet_num"] for e in decoded] == [1, 2]
+    assert "".join(e["text"] for e in decoded) == text
+    assert all(e["mode"] == "FAST" for e in decoded)
+    assert events[0]["event"] == "packet_found"
+    assert events[0]["found_at_s"] == 1.0
+    assert events[-1] == {
+        "event": "message_complete",
+        "found_at_s": decoded[-1]["found_at_s"],
+        "decoded_text": text,
+        "detected_mode": "FAST",
+        "total_packets": 2,
+    }
+
+
+def test_ws_decode_rejects_oversized_frames():
+    frame = np.zeros(WS_MAX_FRAME_SAMPLES + 1, dtype="<f4").tobytes()
+    sent = _run_websocket("/ws/decode", [frame])
+    assert sent[-1]["type"] == "websocket.close"
+    assert sent[-1]["code"] == 1003
+
+
+def test_ws_decode_is_refused_when_executor_is_full(monkeypatch):
+    monkeypatch.setattr(main, "dsp_executor", main.DSPExecutor(1, max_pending=0))
+    sent = _run_websocket("/ws/decode", [np.zeros(10, dtype="<f4").tobytes()])
+    assert sent[-1]["type"] == "websocket.close"
+    assert sent[-1]["code"] == 1013
+
+
+def test_ws_decode_session_holds_an_executor_slot(monkeypatch):
+    executor = main.DSPExecutor(1, max_pending=1)
+    monkeypatch.setattr(main, "dsp_executor", executor)
+    pending = []
+    feed = main.StreamReceiver.feed
+
+    def counting_feed(self, samples):
+        pending.append(executor.pending)
+        return feed(self, samples)
+
+    monkeypatch.setattr(main.StreamReceiver, "feed", counting_feed)
+    _run_websocket("/ws/decode", [np.zeros(10, dtype="<f4").tobytes()])
+    assert pending == [1]
+    # Released when the client disconnects
+    assert executor.pending == 0
+
+
+def test_ws_decode_rejects_unknown_mode():
+    sent = _run_websocket("/ws/decode", [], query_string=b"mode=LOUD")
+    assert sent[-1]["type"] == "websocket.close"
+    assert sent[-1]["code"] == 1008
+
+
+def _spooled_upload(data, max_size):
+    """An UploadFile as Starlette's multipart parser creates it."""
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_size)
+    spooled.write(data)
+    spooled.seek(0)
+    return UploadFile(spooled, filename="upload.wav")
+
+
+def test_small_upload_is_passed_in_memory():
+    data = bytes(range(256)) * 10
+    assert asyncio.run(main._upload_source(_spooled_upload(data, 10**6))) == data
+
+
+def test_large_upload_is_read_where_starlette_spooled_it():
+    """A rolled-over upload is not copied, the worker opens its file."""
+    data = bytes(range(256)) * 10
+    upload = _spooled_upload(data, 1000)
+    source = asyncio.run(main._upload_source(upload))
+    assert isinstance(source, str)
+    with open(source, "rb") as f:
+        assert f.read() == data
+
+
+def _multipart(data):
+    boundary = "spectrachirp"
+    body = (
+        (
+            f"--{boundary}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="upload.wav"\r\n'
+            "Content-Type: audio/wav\r\n\r\n"
+        ).encode()
+        + data
+        + f"\r\n--{boundary}--\r\n".encode()
+    )
+    return body, [("content-type", f"multipart/form-data; boundary={boundary}")]
+
+
+def test_decode_signal_reads_a_spooled_upload(monkeypatch):
+    async def run(fn, *args):
+        return fn(*args)
+
+    monkeypatch.setattr(main.dsp_executor, "run", run)
+    signal, _ = sf.read(send_text_mfsk("Spooled", mode="FAST"))
+    # Longer than the 1 MB Starlette keeps in memory
+    signal = np.concatenate([signal, np.zeros(40 * SAMPLE_RATE)])
+    wav = io.BytesIO()
+    sf.write(wav, signal, SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    body, headers = _multipart(wav.getvalue())
+    status, _, response, _ = _post("/decode_signal", [body], headers)
+    assert status == 200
+    assert json.loads(response)["decoded_text"] == "Spooled"
+
+
+def test_announced_oversized_upload_is_refused_before_reading(monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_MAX_BYTES", 2000)
+    body, headers = _multipart(bytes(3000))
+    headers.append(("content-length", str(len(body))))
+    status, _, _, unread = _post("/decode_signal", [body], headers)
+    assert status == 413
+    assert unread == 1
+
+
+def test_chunked_oversized_upload_is_refused_while_reading(monkeypatch):
+    monkeypatch.setattr(main, "UPLOAD_MAX_BYTES", 2000)
+    body, headers = _multipart(bytes(10000))
+    chunks = [body[i : i + 1000] for i in range(0, len(body), 1000)]
+    status, _, _, unread = _post("/decode_signal", chunks, headers)
+    assert status == 413
+    # Reading stopped with the chunk that went over the limit
+    assert unread == len(chunks) - 3
+
+
+def _post(path, chunks, headers=()):
+    """
+    Drives one HTTP POST with the body in chunks through the ASGI app.
+    Returns (status, headers, response body, number of chunks never read).
+    """
+    incoming = [
+        {"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks
+    ]
+    incoming[-1]["more_body"] = False
+    sent = []
+
+    async def receive():
+        if incoming:
+            return incoming.pop(0)
+        # The client stays connected until the response is complete
+        await asyncio.Event().wait()
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": "POST",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in headers],
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+    }
+    asyncio.run(app(scope, receive, send))
+    start = sent[0]
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    return start["status"], dict(start["headers"]), body, len(incoming)
+
+
+def _post_json(path, body, headers=()):
+    """Drives one HTTP POST with a JSON body through the ASGI app."""
+    status, response_headers, response, _ = _post(
+        path,
+        [json.dumps(body).encode()],
+        [("content-type", "application/json"), *headers],
+    )
+    return status, response_headers, response
+
+
+@pytest.fixture
+def generate_in_process(monkeypatch):
+    """Runs DSP jobs in the test process and counts them."""
+    calls = []
+
+    async def run(fn, *args):
+        calls.append(args)
+        return fn(*args)
+
+    monkeypatch.setattr(main.dsp_executor, "run", run)
+    monkeypatch.setattr(main, "generated_signals", main.GeneratedSignalCache(10**7))
+    return calls
+
+
+def test_generate_signal_is_cached_and_honors_if_none_match(generate_in_process):
+    message = {"text": "Broadcast", "mode": "FAST"}
+    status, headers, wav_bytes = _post_json("/generate_signal", message)
+    assert status == 200
+    etag = headers[b"etag"].decode()
+    assert etag.startswith('"') and etag.endswith('"')
+    assert sf.read(io.BytesIO(wav_bytes))[0].any()
+
+    status, headers, body = _post_json(
+        "/generate_signal", message, [("if-none-match", f'"other", {etag}')]
+    )
+    assert status == 304
+    assert headers[b"etag"].decode() == etag
+    assert body == b""
+    # The second request was answered from the cache
+    assert len(generate_in_process) == 1
+
+    status, headers, _ = _post_json(
+        "/generate_signal", {"text": "Broadcast", "mode": "DEFAULT"}
+    )
+    assert status == 200
+    assert headers[b"etag"].decode() != etag
+
+
+def test_if_none_match_is_answered_without_generating(generate_in_process, monkeypatch):
+    """The ETag is derived from the message, not from the generated file."""
+    message = {"text": "Broadcast", "mode": "FAST", "format": "FLAC"}
+    _, headers, _ = _post_json("/generate_signal", message)
+    etag = headers[b"etag"].decode()
+    # E.g. another worker process, whose cache is empty
+    monkeypatch.setattr(main, "generated_signals", main.GeneratedSignalCache(10**7))
+    status, _, _ = _post_json("/generate_signal", message, [("if-none-match", etag)])
+    assert status == 304
+    assert len(generate_in_process) == 1
+    # The same text in another format is another file
+    _, headers, _ = _post_json("/generate_signal", {**message, "format": "WAV"})
+    assert headers[b"etag"].decode() != etag
+
+
+@pytest.mark.parametrize(
+    "body,accept,media_type,extension",
+    [
+        ({}, None, b"audio/wav", b"wav"),
+        ({}, "*/*", b"audio/wav", b"wav"),
+        ({}, "audio/flac", b"audio/flac", b"flac"),
+        ({}, "audio/wav;q=0.5, audio/ogg", b"audio/ogg", b"ogg"),
+        ({"format": "flac"}, "audio/ogg", b"audio/flac", b"flac"),
+    ],
+)
+def test_generate_signal_format_negotiation(
+    generate_in_process, body, accept, media_type, extension
+):
+    """The format field wins over the Accept header; WAV is the default."""
+    message = {"text": "Broadcast", "mode": "FAST", **body}
+    headers = [("accept", accept)] if accept else []
+    status, headers, audio_bytes = _post_json("/generate_signal", message, headers)
+    assert status == 200
+    assert headers[b"content-type"] == media_type
+    assert headers[b"content-disposition"].endswith(b"." + extension)
+    assert b"Accept" in headers[b"vary"]
+    assert sf.read(io.BytesIO(audio_bytes))[0].any()
+
+
+def test_generate_signal_rejects_unknown_format(generate_in_process):
+    message = {"text": "Broadcast", "mode": "FAST", "format": "MP3"}
+    status, _, _ = _post_json("/generate_signal", message)
+    assert status == 400
+    assert generate_in_process == []
+
+
+def test_large_text_is_streamed_through_the_executor(monkeypatch):
+    """Long texts are streamed, holding an executor slot only while sending."""
+    monkeypatch.setattr(main, "dsp_executor", main.DSPExecutor(1, max_pending=1))
+    text = "streamed " * (STREAMING_TEXT_THRESHOLD // 9 + 1)
+    message = {"text": text, "mode": "FAST"}
+    status, headers, wav_bytes = _post_json("/generate_signal", message)
+    assert status == 200
+    assert b"content-length" not in headers
+    assert wav_bytes == send_text_mfsk(text, mode="FAST").read()
+    assert main.dsp_executor.pending == 0
+
+
+def test_streaming_is_refused_when_executor_is_full(monkeypatch):
+    monkeypatch.setattr(main, "dsp_executor", main.DSPExecutor(1, max_pending=0))
+    message = {"text": "x" * STREAMING_TEXT_THRESHOLD, "mode": "FAST"}
+    status, headers, _ = _post_json("/generate_signal", message)
+    assert status == 503
+    assert b"retry-after" in headers
+
+
+def test_large_compressed_signal_is_sent_from_a_temporary_file(
+    generate_in_process, monkeypatch, tmp_path
+):
+    """Long FLAC texts go through the executor into a file that is removed after."""
+    monkeypatch.setattr(main.tempfile, "tempdir", str(tmp_path))
+    text = "compressed " * (STREAMING_TEXT_THRESHOLD // 11 + 1)
+    message = {"text": text, "mode": "FAST", "format": "FLAC"}
+    status, headers, flac_bytes = _post_json("/generate_signal", message)
+    assert status == 200
+    assert headers[b"content-type"] == b"audio/flac"
+    assert int(headers[b"content-length"]) == len(flac_bytes)
+    assert flac_bytes == send_text_mfsk(text, "FAST", "FLAC").read()
+    assert [args[:3] for args in generate_in_process] == [(text, "FAST", "FLAC")]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_too_long_for_wav_fails_before_the_response(monkeypatch):
+    monkeypatch.setattr(main, "dsp_executor", main.DSPExecutor(1, max_pending=1))
+    message = {"text": "x" * 700_000, "mode": "ROBUST"}
+    status, _, body = _post_json("/generate_signal", message)
+    assert status == 500
+    assert b"size limit of WAV" in body
+    assert main.dsp_executor.pending == 0
+
+
+def test_streamed_signal_has_the_etag_of_the_whole_file(monkeypatch):
+    """Streamed and rendered WAVs are identical, and share one ETag."""
+    text = "x" * STREAMING_TEXT_THRESHOLD
+    message = {"text": text, "mode": "FAST"}
+    monkeypatch.setattr(main, "dsp_executor", main.DSPExecutor(1, max_pending=1))
+    status, headers, _ = _post_json("/generate_signal", message)
+    assert status == 200
+    etag = headers[b"etag"].decode()
+    assert etag == main._signal_etag(text, "FAST", "WAV")
+    # A revalidation needs no slot of the (here full) executor
+    monkeypatch.setattr(main, "dsp_executor", main.DSPExecutor(1, max_pending=0))
+    status, headers, body = _post_json(
+        "/generate_signal", message, [("if-none-match", etag)]
+    )
+    assert status == 304
+    assert headers[b"etag"].decode() == etag
+    assert body == b""
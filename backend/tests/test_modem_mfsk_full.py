@@ -1,10 +1,43 @@
+import io
 import pytest
+import tracemalloc
 import zlib
+from dataclasses import FrozenInstanceError, replace
+from unittest.mock import patch
+import numpy as np
 import soundfile as sf
-from backend.modem_mfsk import send_text_mfsk, receive_text_mfsk, _verify_crc
+import backend.modem_mfsk as modem_mfsk
+from backend.modem_mfsk import (
+    send_text_mfsk,
+    stream_text_mfsk,
+    send_file_mfsk,
+    receive_text_mfsk,
+    analyze_signal,
+    StreamReceiver,
+    PacketFound,
+    PacketDecoded,
+    CRCFailure,
+    MessageComplete,
+    _verify_crc,
+    _demodulate_mfsk_symbols,
+    _bytes_to_signal,
+    _bytes_to_symbols,
+    _symbols_to_bytes,
+    _packet_signal_length,
+    _correlate_with_chirp,
+    generate_chirp_signal,
+    bits_to_bytes,
+)
 from backend.config import (
     MODEM_MODES,
+    MAX_PACKETS,
+    DSP_CACHE_SIZE,
+    MODE_PROBE_PACKETS,
+    PACKET_CHIRP_F0,
+    PACKET_CHIRP_F1,
+    ModemConfig,
     RSC,
+    RSC_BATCH,
     PACKET_PAYLOAD_SIZE,
     PACKET_CRC_SIZE,
     SAMPLE_RATE,
@@ -38,6 +71,467 @@ def test_mfsk_loopback_long_message(mode):
     assert decoded_text == TEST_TEXT_LONG
 
 
+EXPERT_CONFIG = ModemConfig(
+    name="EXPERT",
+    num_tones=8,
+    symbol_duration_ms=120,
+    tone_spacing=20,
+    samples_per_symbol=int(SAMPLE_RATE * 0.12),
+    bits_per_symbol=3,
+)
+
+
+@pytest.mark.parametrize("engine", ["bank", "fwht"])
+@pytest.mark.parametrize(
+    "config", list(MODEM_MODES.values()) + [EXPERT_CONFIG], ids=lambda c: c.name
+)
+def test_demodulator_engines_match_reference(engine, config):
+    """Every fast demodulation engine must pick the same symbols as the original loop."""
+    rng = np.random.default_rng(1234)
+    packet_chunk = rng.normal(size=config.samples_per_symbol * 12)
+    expected = _demodulate_mfsk_symbols(packet_chunk, config, engine="reference")
+    np.testing.assert_array_equal(
+        _demodulate_mfsk_symbols(packet_chunk, config, engine=engine), expected
+    )
+
+
+@pytest.mark.parametrize("engine", ["bank", "fwht"])
+@pytest.mark.parametrize(
+    "config", list(MODEM_MODES.values()) + [EXPERT_CONFIG], ids=lambda c: c.name
+)
+def test_demodulator_engines_decode_clean_symbols(engine, config):
+    """Clean modulated symbols are recovered exactly by every engine."""
+    payload = bytes(range(0, 250, 7))
+    signal = _bytes_to_signal(payload, config)
+    reference_symbols = _demodulate_mfsk_symbols(signal, config, engine="reference")
+    np.testing.assert_array_equal(
+        _demodulate_mfsk_symbols(signal, config, engine=engine), reference_symbols
+    )
+    decoded = _symbols_to_bytes(reference_symbols, config.bits_per_symbol)
+    assert decoded[: len(payload)] == payload
+
+
+@pytest.mark.parametrize("bits_per_symbol", range(1, 9))
+def test_symbol_packing_roundtrip(bits_per_symbol):
+    """Bytes map to symbol indices and back, with the last group zero-padded."""
+    data = bytes(range(0, 256, 3)) + b"\xff"
+    symbols = _bytes_to_symbols(data, bits_per_symbol)
+    bits = "".join(format(byte, "08b") for byte in data)
+    expected = [
+        int(bits[i : i + bits_per_symbol].ljust(bits_per_symbol, "0"), 2)
+        for i in range(0, len(bits), bits_per_symbol)
+    ]
+    assert symbols.tolist() == expected
+    assert _symbols_to_bytes(symbols, bits_per_symbol)[: len(data)] == data
+
+
+def test_bits_to_bytes():
+    assert bits_to_bytes("") == b""
+    assert bits_to_bytes("0100100001101001") == b"Hi"
+    assert bits_to_bytes("1") == b"\x80"
+
+
+def test_demodulator_unknown_engine():
+    with pytest.raises(ValueError):
+        _demodulate_mfsk_symbols(np.zeros(640), MODEM_MODES["DEFAULT"], engine="nope")
+
+
+@pytest.mark.parametrize("mode", MODEM_MODES.keys())
+def test_send_signal_length_matches_packet_layout(mode):
+    """The preallocated signal holds exactly one packet layout per payload chunk."""
+    buffer = send_text_mfsk(TEST_TEXT_LONG, mode=mode)
+    signal, _ = sf.read(buffer)
+    total_packets = -(-len(TEST_TEXT_LONG.encode("utf-8")) // PACKET_PAYLOAD_SIZE)
+    assert len(signal) == total_packets * _packet_signal_length(MODEM_MODES[mode])
+    assert np.max(np.abs(signal)) == pytest.approx(1.0, abs=1e-4)
+
+
+def test_send_empty_text_produces_empty_signal():
+    signal, _ = sf.read(send_text_mfsk(""))
+    assert len(signal) == 0
+
+
+@pytest.mark.parametrize("mode", MODEM_MODES.keys())
+def test_stream_matches_send(mode):
+    """The streamed WAV is byte-identical to the buffered one, one block per packet."""
+    expected = send_text_mfsk(TEST_TEXT_LONG, mode=mode).read()
+    blocks = list(stream_text_mfsk(TEST_TEXT_LONG, mode=mode))
+    total_packets = -(-len(TEST_TEXT_LONG.encode("utf-8")) // PACKET_PAYLOAD_SIZE)
+    assert len(blocks) == 1 + total_packets
+    assert b"".join(blocks) == expected
+
+
+def test_generated_signal_is_deterministic():
+    """Symbol phases are derived from the packets, not a global random state."""
+    first = send_text_mfsk(TEST_TEXT_LONG, mode="FAST").read()
+    np.random.seed(1)
+    assert send_text_mfsk(TEST_TEXT_LONG, mode="FAST").read() == first
+    assert send_text_mfsk(TEST_TEXT_LONG[:-1], mode="FAST").read() != first
+
+
+def test_stream_empty_text_is_a_valid_wav():
+    signal, _ = sf.read(io.BytesIO(b"".join(stream_text_mfsk(""))))
+    assert len(signal) == 0
+
+
+def test_stream_too_long_for_wav_is_refused_up_front():
+    """The WAV size limit is checked before anything is encoded or yielded."""
+    with patch.object(modem_mfsk, "_prepare_mfsk_packets") as prepare:
+        with pytest.raises(ValueError, match="size limit of WAV"):
+            stream_text_mfsk("x" * 700_000, mode="ROBUST")
+    prepare.assert_not_called()
+
+
+def test_send_file_matches_send_text(tmp_path, monkeypatch):
+    """Encoding from a file in small batches gives the same WAV as send_text_mfsk."""
+    monkeypatch.setattr(modem_mfsk, "_FILE_READ_PACKETS", 3)
+    input_path = tmp_path / "message.txt"
+    input_path.write_bytes(TEST_TEXT_LONG.encode("utf-8"))
+    output_path = tmp_path / "message.wav"
+    total_packets = send_file_mfsk(str(input_path), str(output_path), mode="FAST")
+    expected = send_text_mfsk(TEST_TEXT_LONG, mode="FAST").read()
+    expected_packets = -(-len(TEST_TEXT_LONG.encode("utf-8")) // PACKET_PAYLOAD_SIZE)
+    assert total_packets == expected_packets
+    assert output_path.read_bytes() == expected
+
+
+@pytest.mark.parametrize("audio_format", ["FLAC", "OGG"])
+def test_write_text_memory_is_bounded(tmp_path, audio_format):
+    """Compressed files are written packet by packet, not from the whole signal."""
+    text = "y" * 4096
+    send_text_mfsk("warm up", mode="FAST", audio_format=audio_format)
+    path = str(tmp_path / f"message.{audio_format.lower()}")
+    tracemalloc.start()
+    try:
+        total_packets = modem_mfsk.write_text_mfsk(text, path, "FAST", audio_format)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    signal_bytes = total_packets * _packet_signal_length(MODEM_MODES["FAST"]) * 8
+    assert peak < signal_bytes / 10
+    assert receive_text_mfsk(sf.read(path)[0], "FAST")[0] == text
+
+
+@pytest.mark.parametrize("mode", ["DEFAULT", "FAST", "ROBUST"])
+def test_flac_output_decodes_identically(mode):
+    """FLAC is lossless: its samples are those of the WAV file."""
+    wav_signal, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG, mode=mode))
+    flac_buffer = send_text_mfsk(TEST_TEXT_LONG, mode=mode, audio_format="flac")
+    assert flac_buffer.getvalue()[:4] == b"fLaC"
+    flac_signal, sample_rate = sf.read(flac_buffer)
+    assert sample_rate == SAMPLE_RATE
+    np.testing.assert_array_equal(flac_signal, wav_signal)
+    decoded_text, _, _, detected_mode = receive_text_mfsk(flac_signal, mode)
+    assert (decoded_text, detected_mode) == (TEST_TEXT_LONG, mode)
+
+
+def test_ogg_output_still_decodes():
+    """Lossy Vorbis keeps the tones intact in a much smaller file."""
+    wav_bytes = send_text_mfsk(TEST_TEXT_LONG, mode="DEFAULT").read()
+    ogg_buffer = send_text_mfsk(TEST_TEXT_LONG, mode="DEFAULT", audio_format="OGG")
+    assert len(ogg_buffer.getvalue()) < len(wav_bytes) / 3
+    ogg_signal, _ = sf.read(ogg_buffer)
+    assert receive_text_mfsk(ogg_signal, "DEFAULT")[0] == TEST_TEXT_LONG
+
+
+def test_send_file_writes_requested_format(tmp_path):
+    input_path = tmp_path / "message.txt"
+    input_path.write_bytes(TEST_TEXT_LONG.encode("utf-8"))
+    output_path = tmp_path / "message.flac"
+    send_file_mfsk(str(input_path), str(output_path), audio_format="FLAC")
+    expected, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG))
+    np.testing.assert_array_equal(sf.read(str(output_path))[0], expected)
+
+
+def test_unknown_audio_format_is_rejected():
+    with pytest.raises(ValueError, match="audio format"):
+        send_text_mfsk("hello", audio_format="MP3")
+
+
+def test_send_file_rejects_too_many_packets(tmp_path):
+    """Inputs beyond the 2-byte packet counter fail before any output is written."""
+    input_path = tmp_path / "huge.txt"
+    with open(input_path, "wb") as f:
+        f.truncate(MAX_PACKETS * PACKET_PAYLOAD_SIZE + 1)
+    output_path = tmp_path / "huge.wav"
+    with pytest.raises(ValueError, match="packets"):
+        send_file_mfsk(str(input_path), str(output_path))
+    assert not output_path.exists()
+
+
+@pytest.mark.parametrize("signal_len", [2000, 3300, 16000, 6593 * 64 + 1601])
+def test_chirp_correlation_matches_direct(signal_len):
+    """The FFT correlator reproduces np.correlate on both sides of the crossover."""
+    rng = np.random.default_rng(signal_len)
+    signal = rng.normal(size=signal_len)
+    expected = np.correlate(signal, generate_chirp_signal(), mode="valid")
+    correlation = _correlate_with_chirp(signal)
+    assert correlation.shape == expected.shape
+    np.testing.assert_allclose(correlation, expected, atol=1e-8)
+
+
+@pytest.mark.parametrize("earliest", [False, True])
+def test_chirp_sync_memory_is_bounded(earliest):
+    """The preamble filter bank keeps about one correlation, not one per chirp."""
+    packet, _ = sf.read(send_text_mfsk(TEST_TEXT_SHORT, mode="FAST"))
+    signal = np.random.default_rng(3).normal(0, 0.01, 300 * SAMPLE_RATE)
+    signal[SAMPLE_RATE : SAMPLE_RATE + len(packet)] += packet
+    tracemalloc.start()
+    try:
+        sync = modem_mfsk._sync_chirps(signal, earliest=earliest)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert (sync.mode_name, sync.first_peak) == ("FAST", SAMPLE_RATE)
+    # The normalized signal, the winning correlation and FFT scratch blocks
+    assert peak < 3 * signal.nbytes
+
+
+def test_auto_detect_correlates_chirp_once():
+    """Trying several modes shares one normalization and chirp correlation."""
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_SHORT, mode="FAST"))
+    with (
+        patch.object(
+            modem_mfsk, "_sync_chirps", wraps=modem_mfsk._sync_chirps
+        ) as sync_chirps,
+        patch.object(
+            modem_mfsk,
+            "_chirp_correlation_pieces",
+            wraps=modem_mfsk._chirp_correlation_pieces,
+        ) as filter_bank,
+    ):
+        decoded_text, _, _, detected_mode = receive_text_mfsk(signal, mode="DEFAULT")
+    assert decoded_text == TEST_TEXT_SHORT
+    assert detected_mode == "FAST"
+    # One pass through the preamble filter bank, plus the recompute of the
+    # winning chirp inside that same sync
+    assert sync_chirps.call_count == 1
+    assert filter_bank.call_count == 2
+
+
+def _demodulated_packets(demodulate):
+    """Number of packets passed through a patched _demodulate_mfsk_symbols."""
+    return sum(
+        len(call.args[0]) // modem_mfsk._samples_per_packet(call.args[1])
+        for call in demodulate.call_args_list
+    )
+
+
+@pytest.mark.parametrize("mode", MODEM_MODES.keys())
+def test_preamble_identifies_mode(mode):
+    """A mode-signalling preamble leads straight to a single demodulation run."""
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG, mode=mode))
+    assert modem_mfsk._sync_chirps(signal).mode_name == mode
+    with patch.object(
+        modem_mfsk,
+        "_demodulate_mfsk_symbols",
+        wraps=modem_mfsk._demodulate_mfsk_symbols,
+    ) as demodulate:
+        decoded_text, _, _, detected_mode = receive_text_mfsk(signal, mode="DEFAULT")
+    assert decoded_text == TEST_TEXT_LONG
+    assert detected_mode == mode
+    total_packets = -(-len(TEST_TEXT_LONG.encode("utf-8")) // PACKET_PAYLOAD_SIZE)
+    assert _demodulated_packets(demodulate) == total_packets
+
+
+@pytest.mark.parametrize("mode", MODEM_MODES.keys())
+def test_legacy_preamble_still_decodes(mode):
+    """Signals using the old single chirp for every mode fall back to trial decoding."""
+    legacy_config = replace(
+        MODEM_MODES[mode], chirp_f0=PACKET_CHIRP_F0, chirp_f1=PACKET_CHIRP_F1
+    )
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG, mode=legacy_config))
+    assert modem_mfsk._sync_chirps(signal).mode_name is None
+    decoded_text, _, _, detected_mode = receive_text_mfsk(signal)
+    assert decoded_text == TEST_TEXT_LONG
+    assert detected_mode == mode
+
+
+def test_wrong_modes_are_rejected_after_probe():
+    """Modes that fail the probe are not fully demodulated before the right one."""
+    legacy_fast = replace(
+        MODEM_MODES["FAST"], chirp_f0=PACKET_CHIRP_F0, chirp_f1=PACKET_CHIRP_F1
+    )
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG * 2, mode=legacy_fast))
+    with patch.object(
+        modem_mfsk,
+        "_demodulate_mfsk_symbols",
+        wraps=modem_mfsk._demodulate_mfsk_symbols,
+    ) as demodulate:
+        decoded_text, _, _, detected_mode = receive_text_mfsk(signal, mode="DEFAULT")
+    assert decoded_text == TEST_TEXT_LONG * 2
+    assert detected_mode == "FAST"
+    fast_packets = -(-len((TEST_TEXT_LONG * 2).encode("utf-8")) // PACKET_PAYLOAD_SIZE)
+    assert _demodulated_packets(demodulate) <= fast_packets + 2 * MODE_PROBE_PACKETS
+
+
+def _write_long_recording(path, text, mode, lead_in):
+    """Writes a noisy recording of text that starts lead_in samples late."""
+    signal, _ = sf.read(send_text_mfsk(text, mode=mode))
+    signal = np.concatenate([np.zeros(lead_in), signal, np.zeros(5000)])
+    signal += np.random.default_rng(3).normal(0, 0.05, len(signal))
+    sf.write(path, signal, SAMPLE_RATE, subtype="PCM_16")
+    return sf.read(path)[0]
+
+
+@pytest.mark.parametrize("mode", MODEM_MODES.keys())
+def test_block_wise_decoding_matches_whole_file(tmp_path, monkeypatch, mode):
+    """Windowed decoding finds the same packets as decoding the whole recording."""
+    monkeypatch.setattr(modem_mfsk, "BLOCK_DECODE_SECONDS", 20)
+    path = str(tmp_path / "long.wav")
+    text = TEST_TEXT_LONG * 6
+    signal = _write_long_recording(path, text, mode, lead_in=12345)
+
+    decoded_text, _, _, detected_mode = modem_mfsk.receive_file_mfsk(path)
+    assert decoded_text == text
+    assert detected_mode == mode
+
+    block_mode, block_results = modem_mfsk.analyze_file(path)
+    whole_mode, whole_results = analyze_signal(signal)
+    assert block_mode == whole_mode == mode
+    assert [r.found_at_s for r in block_results] == [
+        r.found_at_s for r in whole_results
+    ]
+    assert all(r.crc_valid for r in block_results)
+
+
+def test_block_wise_decoding_stops_when_message_is_complete(tmp_path, monkeypatch):
+    """Windows after the last packet of the message are not read."""
+    monkeypatch.setattr(modem_mfsk, "BLOCK_DECODE_SECONDS", 20)
+    path = str(tmp_path / "long.wav")
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG, mode="FAST"))
+    sf.write(path, np.concatenate([signal, np.zeros(SAMPLE_RATE * 120)]), SAMPLE_RATE)
+    with patch.object(
+        modem_mfsk, "_sync_chirps", wraps=modem_mfsk._sync_chirps
+    ) as sync_chirps:
+        decoded_text, _, _, _ = modem_mfsk.receive_file_mfsk(path)
+    assert decoded_text == TEST_TEXT_LONG
+    # The message ends within the second 20 s window; the silence after it
+    # would take about ten more
+    assert sync_chirps.call_count <= 2
+
+
+def test_packet_with_truncated_chirp_is_recovered():
+    """A recording that starts inside the first chirp still yields that packet."""
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG))
+    decoded_text, _, _, _ = receive_text_mfsk(signal[160:])
+    assert decoded_text == TEST_TEXT_LONG
+    _, results = analyze_signal(signal[160:])
+    assert results[0].found_at_s == 0
+    assert results[0].crc_valid
+
+
+def test_silence_before_first_chirp_is_not_a_truncated_packet(tmp_path):
+    """A lead-in about one packet long does not yield a phantom first packet."""
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_SHORT * 4, mode="DEFAULT"))
+    signal = np.concatenate([np.zeros(59500), signal])
+    path = str(tmp_path / "lead_in.wav")
+    sf.write(path, signal, SAMPLE_RATE)
+    for mode, results in (analyze_signal(signal), modem_mfsk.analyze_file(path)):
+        assert mode == "DEFAULT"
+        assert len(results) == 2
+        assert all(r.crc_valid and r.found_at_s > 0 for r in results)
+
+
+def _feed_in_chunks(receiver, signal, seed=0):
+    """Feeds signal in chunks of random size and returns all events."""
+    rng = np.random.default_rng(seed)
+    events, start = [], 0
+    while start < len(signal):
+        stop = start + int(rng.integers(100, 5000))
+        events += receiver.feed(signal[start:stop])
+        start = stop
+    return events
+
+
+@pytest.mark.parametrize("mode", MODEM_MODES.keys())
+def test_stream_receiver_yields_packet_and_message_events(mode):
+    """Chunked feeding reports every packet once, then the complete message."""
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG, mode=mode))
+    signal = np.concatenate([np.zeros(7000), signal, np.zeros(3000)])
+    events = _feed_in_chunks(StreamReceiver(), signal)
+
+    total = -(-len(TEST_TEXT_LONG) // PACKET_PAYLOAD_SIZE)
+    packet_len = _packet_signal_length(MODEM_MODES[mode])
+    found = [e for e in events if isinstance(e, PacketFound)]
+    decoded = [e for e in events if isinstance(e, PacketDecoded)]
+    assert [e.position for e in found] == [
+        7000 + i * packet_len for i in range(total)
+    ]
+    assert [e.packet_num for e in decoded] == list(range(1, total + 1))
+    assert all(e.mode_name == mode and e.total_packets == total for e in decoded)
+    assert isinstance(events[-1], MessageComplete)
+    assert events[-1].text == TEST_TEXT_LONG
+    assert events[-1].mode_name == mode
+
+
+def test_stream_receiver_reports_crc_failure_and_partial_message():
+    """A destroyed packet yields a CRC failure and leaves the message partial."""
+    text = "a" * PACKET_PAYLOAD_SIZE + "b" * PACKET_PAYLOAD_SIZE + "c"
+    signal, _ = sf.read(send_text_mfsk(text, mode="FAST"))
+    packet_len = _packet_signal_length(MODEM_MODES["FAST"])
+    chirp_len = len(generate_chirp_signal())
+    # Keep the chirp of the second packet but replace its data with noise
+    damaged = slice(packet_len + chirp_len, 2 * packet_len)
+    signal[damaged] = np.random.default_rng(4).uniform(-1, 1, 2 * packet_len)[damaged]
+    receiver = StreamReceiver()
+    events = _feed_in_chunks(receiver, signal)
+
+    assert [type(e) for e in events] == [
+        PacketFound,
+        PacketDecoded,
+        PacketFound,
+        CRCFailure,
+        PacketFound,
+        PacketDecoded,
+    ]
+    assert receiver.partial_message() == "a" * PACKET_PAYLOAD_SIZE + "c"
+
+
+def test_stream_receiver_memory_is_bounded_on_repeated_incomplete_message():
+    """Repeats of a message that never completes replace the packets kept."""
+    text = "a" * PACKET_PAYLOAD_SIZE + "b" * PACKET_PAYLOAD_SIZE + "c"
+    signal, _ = sf.read(send_text_mfsk(text, mode="FAST"))
+    packet_len = _packet_signal_length(MODEM_MODES["FAST"])
+    # The second packet is always lost
+    signal[packet_len : 2 * packet_len] = 0
+    receiver = StreamReceiver()
+    events = _feed_in_chunks(receiver, np.tile(signal, 6))
+
+    assert sum(isinstance(e, PacketDecoded) for e in events) == 12
+    assert not any(isinstance(e, MessageComplete) for e in events)
+    assert len(receiver._packet_results) == 2
+    assert receiver.partial_message() == "a" * PACKET_PAYLOAD_SIZE + "c"
+
+
+@pytest.mark.parametrize("mode", MODEM_MODES.keys())
+def test_analyze_signal_detects_mode(mode):
+    signal, _ = sf.read(send_text_mfsk(TEST_TEXT_LONG, mode=mode))
+    detected_mode, results = analyze_signal(signal)
+    assert detected_mode == mode
+    assert results and all(r.crc_valid for r in results)
+    assert [r.packet_num for r in results] == list(range(1, len(results) + 1))
+
+
+def test_modem_config_is_frozen_and_hashable():
+    config = MODEM_MODES["DEFAULT"]
+    with pytest.raises(FrozenInstanceError):
+        config.num_tones = 8
+    assert hash(config) == hash(replace(config))
+
+
+def test_dsp_artifacts_are_shared_per_config():
+    """Equal configs share one set of artifacts; the cache stays bounded."""
+    artifacts = modem_mfsk._dsp_artifacts(MODEM_MODES["DEFAULT"])
+    assert modem_mfsk._dsp_artifacts(replace(MODEM_MODES["DEFAULT"])) is artifacts
+    assert artifacts.symbol_table is artifacts.symbol_table
+    assert not artifacts.reference_bank[0].flags.writeable
+    for tone_spacing in range(1, DSP_CACHE_SIZE + 5):
+        expert = replace(EXPERT_CONFIG, tone_spacing=tone_spacing)
+        modem_mfsk._dsp_artifacts(expert).hadamard
+    assert modem_mfsk._dsp_artifacts.cache_info().currsize <= DSP_CACHE_SIZE
+
+
 def test_reed_solomon_error_correction():
     """Tests Reed-Solomon error correction capability."""
     original_message = b"This is a test message for Reed-Solomon."
@@ -111,6 +605,27 @@ def test_verify_crc():
     assert _verify_crc(packet_content, short_crc) is False
 
 
+def test_decode_skips_rs_correction_for_clean_codewords():
+    """Error-free packets bypass full RS correction but still report zero corrections."""
+    config = MODEM_MODES["DEFAULT"]
+    encoded = bytearray(modem_mfsk._prepare_mfsk_packets(b"clean packet", 3, 7)[0])
+    fallback = RSC_BATCH.fallback
+    with patch.object(fallback, "decode", wraps=fallback.decode) as rs_decode:
+        (result,) = modem_mfsk._demodulate_and_decode(
+            [_bytes_to_signal(bytes(encoded), config)], config
+        )
+        assert rs_decode.call_count == 0
+        assert result[1:] == (3, 7, 0, True)
+        assert result[0].rstrip(b"\x00") == b"clean packet"
+
+        encoded[5] ^= 0x42
+        (result,) = modem_mfsk._demodulate_and_decode(
+            [_bytes_to_signal(bytes(encoded), config)], config
+        )
+        assert rs_decode.call_count == 1
+        assert result[1:] == (3, 7, 1, True)
+
+
 # def test_packet_crc_integrity():
 #     """Tests that packets with incorrect CRC are discarded by receive_text_mfsk."""
 #     # This test is complex and appears to be incomplete. It also uses the old, incorrect
@@ -0,0 +1,58 @@
+import zlib
+import numpy as np
+import pytest
+from backend.config import (
+    RSC,
+    RSC_BATCH,
+    RS_NSYMS,
+    PACKET_CRC_SIZE,
+    PACKET_PAYLOAD_SIZE,
+)
+from backend.modem_mfsk import _prepare_mfsk_packets
+
+
+@pytest.fixture
+def messages():
+    rng = np.random.default_rng(1234)
+    return rng.integers(0, 256, size=(200, 40), dtype=np.uint8)
+
+
+def test_batch_encode_matches_reedsolo(messages):
+    """The batch encoder produces exactly the codewords of reedsolo."""
+    codewords = RSC_BATCH.encode(messages)
+    for message, codeword in zip(messages, codewords):
+        assert codeword.tobytes() == bytes(RSC.encode(message.tobytes()))
+
+
+def test_batch_decode_clean_codewords(messages):
+    """Clean codewords pass the syndrome check and decode without corrections."""
+    codewords = RSC_BATCH.encode(messages)
+    assert RSC_BATCH.check(codewords).all()
+    decoded, errors_corrected = RSC_BATCH.decode(codewords)
+    np.testing.assert_array_equal(decoded, messages)
+    np.testing.assert_array_equal(errors_corrected, 0)
+
+
+def test_batch_decode_corrects_and_flags_errors(messages):
+    """Corrupted rows are corrected up to nsym/2 errors and flagged beyond that."""
+    codewords = RSC_BATCH.encode(messages[:3])
+    codewords[0, [1, 7]] ^= 0xFF
+    codewords[2, : RS_NSYMS // 2 + 1] ^= 0x55
+    assert RSC_BATCH.check(codewords).tolist() == [False, True, False]
+    decoded, errors_corrected = RSC_BATCH.decode(codewords)
+    assert errors_corrected.tolist() == [2, 0, -1]
+    np.testing.assert_array_equal(decoded[:2], messages[:2])
+
+
+def test_prepare_packets_matches_single_packets():
+    """Batch packet preparation matches encoding each packet on its own."""
+    data = bytes(range(256)) * 2 + b"tail"
+    encoded = _prepare_mfsk_packets(data)
+    total = -(-len(data) // PACKET_PAYLOAD_SIZE)
+    assert encoded.shape[0] == total
+    for i, row in enumerate(encoded):
+        chunk = data[i * PACKET_PAYLOAD_SIZE : (i + 1) * PACKET_PAYLOAD_SIZE]
+        header = (i + 1).to_bytes(2, "big") + total.to_bytes(2, "big")
+        content = header + chunk.ljust(PACKET_PAYLOAD_SIZE, b"\x00")
+        crc = zlib.crc32(content).to_bytes(PACKET_CRC_SIZE, "big")
+        assert row.tobytes() == bytes(RSC.encode(content + crc))
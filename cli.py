@@ -3,6 +3,7 @@ from typing_extensions import Annotated
 import soundfile as sf
 import numpy as np
 import sys
+import time
 from typing import Optional
 
 # Attempt to import sounddevice and provide a helpful error message if it's missing.
@@ -21,10 +22,22 @@ except ImportError:
 
 from backend.modem_mfsk import (
     send_text_mfsk,
+    send_file_mfsk,
     receive_text_mfsk,
+    receive_file_mfsk,
     analyze_signal,
+    analyze_file,
+    MessageComplete,
+    PacketDecoded,
+)
+from backend.live_audio import LiveReceiver, LiveTransmitter
+from backend.config import (
+    AUDIO_FORMATS,
+    MODEM_MODES,
+    SAMPLE_RATE,
+    BLOCK_DECODE_MIN_SECONDS,
+    ModemConfig,
 )
-from backend.config import MODEM_MODES, SAMPLE_RATE, ModemConfig
 
 # Dynamically create the help text for the --mode option
 mode_help = (
@@ -32,6 +45,7 @@ mode_help = (
     "FAST (for speed), ROBUST (for reliability)."
 )
 
+
 # --- Examples Epilog --- #
 
 epilog_text = """
@@ -41,7 +55,7 @@ Examples:
 
   2. Play back the generated audio file:				spectrachirp play message.wav
 
-  3. Record a message for 5 seconds and print the result:		spectrachirp receive --live --duration 5
+  3. Listen for messages for 5 seconds and print them:		spectrachirp receive --live --duration 5
 
   4. Decode a message from a file and save the result:		spectrachirp receive message.wav --to-file decoded.txt
 
@@ -91,6 +105,9 @@ Examples:
   Send from a file and save to a custom audio file:
     spectrachirp send --from-file message.txt -o custom.wav
 
+  Save a smaller compressed file ('modem_signal.ogg'):
+    spectrachirp send 'hello there' --format OGG
+
   Send a message in ROBUST mode and play it live:
     spectrachirp send "live robust" --mode ROBUST --live
     
@@ -119,14 +136,25 @@ def send(
         ),
     ] = None,
     output_file: Annotated[
-        str,
+        Optional[str],
         typer.Option(
             "--output",
             "-o",
-            help="Path to save the output WAV file.",
+            help="Path to save the output audio file "
+            "[default: modem_signal.<format extension>].",
+            rich_help_panel="File Options",
+        ),
+    ] = None,
+    audio_format: Annotated[
+        str,
+        typer.Option(
+            "--format",
+            help="Output file format: WAV, FLAC (lossless) or OGG "
+            "(Vorbis, much smaller).",
+            case_sensitive=False,
             rich_help_panel="File Options",
         ),
-    ] = "modem_signal.wav",
+    ] = "WAV",
     # Mode Options
     mode: Annotated[
         str,
@@ -191,7 +219,9 @@ def send(
     if from_file:
         try:
             with open(from_file, "r") as f:
-                text_to_send = f.read()
+                # Only live playback needs the whole message in memory; files
+                # are encoded straight from disk, so read just a preview.
+                text_to_send = f.read() if live else f.read(101)
             typer.echo(f"Reading message from '{from_file}'")
         except FileNotFoundError:
             typer.secho(
@@ -244,45 +274,80 @@ def send(
         config_to_use = mode.upper()
         typer.echo(f"Using mode: {config_to_use}")
 
+    if audio_format.upper() not in AUDIO_FORMATS:
+        typer.secho(
+            f"Error: Invalid format '{audio_format}'. Please choose from "
+            f"{list(AUDIO_FORMATS.keys())}.",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+    audio_format = audio_format.upper()
+    if output_file is None:
+        output_file = f"modem_signal.{AUDIO_FORMATS[audio_format].extension}"
+
     typer.echo(
         f"Encoding text: '{text_to_send[:100]}"
         f"{'...' if len(text_to_send) > 100 else ''}'"
     )
 
-    # The function now returns a BytesIO buffer with the WAV data
-    wav_buffer = send_text_mfsk(text_to_send, mode=config_to_use)
+    if from_file and not live:
+        # Read, modulate and write packet by packet with constant memory
+        try:
+            send_file_mfsk(
+                from_file, output_file, mode=config_to_use, audio_format=audio_format
+            )
+        except ValueError as e:
+            typer.secho(f"Error: {e}", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        except Exception as e:
+            typer.secho(f"Error writing file: {e}", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+        typer.secho(
+            f"Successfully generated signal and saved to '{output_file}'",
+            fg=typer.colors.GREEN,
+        )
+        return
 
     if live:
+        # Packets are played as soon as they are modulated, without a WAV file
+        try:
+            transmitter = LiveTransmitter(
+                text_to_send, mode=config_to_use, stream_factory=sd.OutputStream
+            )
+        except ValueError as e:
+            typer.secho(f"Error: {e}", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
         try:
-            # Read the data from the buffer for playback
-            wav_buffer.seek(0)
-            signal, samplerate = sf.read(wav_buffer)
-            if samplerate != SAMPLE_RATE:
-                typer.secho(
-                    f"Warning: Internal sample rate mismatch. Expected {SAMPLE_RATE}, got {samplerate}",
-                    fg=typer.colors.YELLOW,
-                )
-
             typer.echo("Playing audio signal...")
-            sd.play(signal, SAMPLE_RATE)
-            sd.wait()
+            with transmitter:
+                transmitter.wait()
             typer.secho("Playback complete.", fg=typer.colors.GREEN)
         except Exception as e:
             typer.secho(f"Error playing audio: {e}", fg=typer.colors.RED)
             raise typer.Exit(code=1)
-    else:
-        try:
-            # Write the buffer's content directly to the output file
-            wav_buffer.seek(0)
-            with open(output_file, "wb") as f:
-                f.write(wav_buffer.read())
-            typer.secho(
-                f"Successfully generated signal and saved to '{output_file}'",
-                fg=typer.colors.GREEN,
-            )
-        except Exception as e:
-            typer.secho(f"Error writing file: {e}", fg=typer.colors.RED)
-            raise typer.Exit(code=1)
+        return
+
+    # The function now returns a BytesIO buffer with the audio file
+    try:
+        wav_buffer = send_text_mfsk(
+            text_to_send, mode=config_to_use, audio_format=audio_format
+        )
+    except ValueError as e:
+        typer.secho(f"Error: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    try:
+        # Write the buffer's content directly to the output file
+        wav_buffer.seek(0)
+        with open(output_file, "wb") as f:
+            f.write(wav_buffer.read())
+        typer.secho(
+            f"Successfully generated signal and saved to '{output_file}'",
+            fg=typer.colors.GREEN,
+        )
+    except Exception as e:
+        typer.secho(f"Error writing file: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
 
 
 @app.command(
@@ -292,8 +357,11 @@ Examples:
   Decode from the default 'modem_signal.wav' file:
     spectrachirp receive modem_signal.wav
 
-  Record live for 5 seconds and print the decoded message:
-    spectrachirp receive --live --duration 5
+  Listen until Ctrl+C and print messages as they arrive:
+    spectrachirp receive --live
+
+  Listen for 60 seconds only:
+    spectrachirp receive --live --duration 60
 
   Decode from a file and save the output to another file:
     spectrachirp receive input.wav --to-file decoded.txt
@@ -322,49 +390,39 @@ def receive(
         typer.Option(
             "--live",
             "-l",
-            help="Record audio directly from the microphone.",
+            help="Listen to the microphone and decode messages as they arrive.",
             rich_help_panel="Live Options",
         ),
     ] = False,
     duration: Annotated[
-        int,
+        Optional[int],
         typer.Option(
             "--duration",
             "-d",
-            help="Recording duration in seconds for live mode.",
+            help="Stop listening after this many seconds (default: until Ctrl+C).",
             rich_help_panel="Live Options",
         ),
-    ] = 10,
+    ] = None,
 ):
     signal = None
+    block_wise = False
     if live:
         if input_file:
             typer.secho(
                 "Warning: Input file argument is ignored when using --live mode.",
                 fg=typer.colors.YELLOW,
             )
+        _receive_live(duration, to_file)
+        return
+    if input_file:
         try:
-            typer.echo(
-                f"Recording for {duration} seconds... Press Ctrl+C to stop early."
-            )
-            recording = sd.rec(
-                int(duration * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1
-            )
-            sd.wait()
-            typer.echo("Recording finished.")
-            signal = recording.flatten()
-        except KeyboardInterrupt:
-            typer.echo("\nRecording stopped by user.")
-            sd.stop()
-            signal = sd.rec(
-                int(duration * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=1
-            ).flatten()
-        except Exception as e:
-            typer.secho(f"Error during recording: {e}", fg=typer.colors.RED)
-            raise typer.Exit(code=1)
-    elif input_file:
-        try:
-            signal, sample_rate = sf.read(input_file)
+            info = sf.info(input_file)
+            if info.frames > BLOCK_DECODE_MIN_SECONDS * info.samplerate:
+                # Decoded window by window below instead of loaded in full
+                block_wise = True
+                sample_rate = info.samplerate
+            else:
+                signal, sample_rate = sf.read(input_file)
             if sample_rate != SAMPLE_RATE:
                 typer.secho(
                     f"Warning: File sample rate ({sample_rate} Hz) "
@@ -381,12 +439,16 @@ def receive(
         )
         raise typer.Exit(code=1)
 
-    if signal is None or not signal.any():
-        typer.secho("No audio signal to process.", fg=typer.colors.RED)
-        raise typer.Exit(code=1)
+    if block_wise:
+        typer.echo("Long recording, decoding it block by block...")
+        decoded_text, _, _, detected_mode = receive_file_mfsk(input_file)
+    else:
+        if signal is None or not signal.any():
+            typer.secho("No audio signal to process.", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
 
-    typer.echo("Decoding signal...")
-    decoded_text, _, _, detected_mode = receive_text_mfsk(signal)
+        typer.echo("Decoding signal...")
+        decoded_text, _, _, detected_mode = receive_text_mfsk(signal)
 
     if detected_mode:
         typer.echo(f"Automatically detected mode: {detected_mode}")
@@ -412,6 +474,71 @@ def receive(
         raise typer.Exit(code=1)
 
 
+def _receive_live(duration: Optional[int], to_file: Optional[str]):
+    """Listens continuously and prints every message as soon as it is complete."""
+    decoded_messages = []
+
+    def on_event(event):
+        if isinstance(event, PacketDecoded):
+            typer.echo(
+                f"Received packet {event.packet_num} of {event.total_packets} "
+                f"({event.mode_name})"
+            )
+        elif isinstance(event, MessageComplete):
+            decoded_messages.append(event.text)
+            typer.echo(f"Automatically detected mode: {event.mode_name}")
+            typer.secho("Decoded Message:", fg=typer.colors.CYAN)
+            typer.echo(event.text)
+
+    receiver = LiveReceiver(on_event=on_event, stream_factory=sd.InputStream)
+    try:
+        with receiver:
+            if duration is None:
+                typer.echo("Listening... Press Ctrl+C to stop.")
+                while True:
+                    time.sleep(1)
+            else:
+                typer.echo(
+                    f"Listening for {duration} seconds... Press Ctrl+C to stop early."
+                )
+                time.sleep(duration)
+        typer.echo("Stopped listening.")
+    except KeyboardInterrupt:
+        # Leaving the with block has stopped the stream and decoded what
+        # was already captured
+        typer.echo("\nStopped listening.")
+    except Exception as e:
+        typer.secho(f"Error during recording: {e}", fg=typer.colors.RED)
+        raise typer.Exit(code=1)
+
+    if receiver.ring.dropped:
+        typer.secho(
+            f"Warning: {receiver.ring.dropped} samples were dropped because "
+            "decoding fell behind.",
+            fg=typer.colors.YELLOW,
+        )
+    partial = receiver.partial_message()
+    if partial:
+        typer.secho("Incomplete message received:", fg=typer.colors.YELLOW)
+        typer.echo(partial)
+        decoded_messages.append(partial)
+    if not decoded_messages:
+        typer.secho(
+            "Failed to decode the message. The signal may be too noisy "
+            "or not a valid modem signal.",
+            fg=typer.colors.RED,
+        )
+        raise typer.Exit(code=1)
+    if to_file:
+        try:
+            with open(to_file, "w") as f:
+                f.write("\n".join(decoded_messages))
+            typer.secho(f"Decoded message saved to '{to_file}'", fg=typer.colors.GREEN)
+        except Exception as e:
+            typer.secho(f"Error writing to file: {e}", fg=typer.colors.RED)
+            raise typer.Exit(code=1)
+
+
 @app.command(
     help="Inspect an audio file for modem signals and packet data.",
     epilog="""
@@ -423,8 +550,14 @@ Example:
 def analyze(
     input_file: Annotated[str, typer.Argument(help="Path to the WAV file to analyze.")],
 ):
+    signal = None
     try:
-        signal, sample_rate = sf.read(input_file)
+        info = sf.info(input_file)
+        if info.frames > BLOCK_DECODE_MIN_SECONDS * info.samplerate:
+            # Analyzed window by window below instead of loaded in full
+            sample_rate = info.samplerate
+        else:
+            signal, sample_rate = sf.read(input_file)
         if sample_rate != SAMPLE_RATE:
             typer.secho(
                 f"Warning: File sample rate ({sample_rate} Hz) "
@@ -436,7 +569,10 @@ def analyze(
         raise typer.Exit(code=1)
 
     typer.echo(f"Analyzing signal from '{input_file}'...")
-    detected_mode, analysis_results = analyze_signal(signal)
+    if signal is None:
+        detected_mode, analysis_results = analyze_file(input_file)
+    else:
+        detected_mode, analysis_results = analyze_signal(signal)
 
     if not detected_mode:
         typer.secho(
@@ -0,0 +1,13 @@
+// Hands every captured block of microphone samples to the main thread,
+// which batches them into frames for the /ws/decode websocket.
+class PCMCaptureProcessor extends AudioWorkletProcessor {
+  process(inputs) {
+    const channel = inputs[0][0];
+    if (channel) {
+      this.port.postMessage(channel.slice(0));
+    }
+    return true;
+  }
+}
+
+registerProcessor('pcm-capture', PCMCaptureProcessor);
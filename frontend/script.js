@@ -1,6 +1,12 @@
 const API_BASE = window.location.hostname === "localhost" || window.location.hostname === "127.0.0.1"
   ? "http://127.0.0.1:8001"
   : "";
+// Websocket URL of the same server, e.g. ws://127.0.0.1:8001
+const WS_BASE = (API_BASE || window.location.origin).replace(/^http/, "ws");
+// Must match SAMPLE_RATE of the modem; the browser resamples the microphone
+const SAMPLE_RATE = 16000;
+// Samples per websocket frame (0.1 s)
+const FRAME_SAMPLES = 1600;
 const sendBtn = document.getElementById('send-btn');
 const clearBtn = document.getElementById('clear-btn');
 const inputText = document.getElementById('input-text');
@@ -37,8 +43,7 @@ const copyDecodedBtn = document.getElementById('copy-decoded-btn');
 const recordBtn = document.getElementById('record-btn');
 const stopBtn = document.getElementById('stop-btn');
 const recordStatus = document.getElementById('record-status');
-let mediaRecorder;
-let audioChunks = [];
+let liveSession = null;
 
 
 // Send (Generate Signal)
@@ -103,57 +108,11 @@ clearBtn.onclick = () => {
 
 // --- Decode Logic ---
 
-function encodeWAV(audioBuffer) {
-    const numOfChan = audioBuffer.numberOfChannels;
-    const samples = audioBuffer.getChannelData(0); // Assuming mono for simplicity, or handle multiple channels
-
-    const dataLength = samples.length * numOfChan * 2; // 2 bytes per sample
-    const buffer = new ArrayBuffer(44 + dataLength);
-    const view = new DataView(buffer);
-
-    /* RIFF identifier */
-    writeString(view, 0, 'RIFF');
-    /* file length */
-    view.setUint32(4, 36 + dataLength, true);
-    /* RIFF type */
-    writeString(view, 8, 'WAVE');
-    /* format chunk identifier */
-    writeString(view, 12, 'fmt ');
-    /* format chunk length */
-    view.setUint32(16, 16, true);
-    /* sample format (raw) */
-    view.setUint16(20, 1, true);
-    /* channel count */
-    view.setUint16(22, numOfChan, true);
-    /* sample rate */
-    view.setUint32(24, audioBuffer.sampleRate, true);
-    /* byte rate (sample rate * block align) */
-    view.setUint32(28, audioBuffer.sampleRate * numOfChan * 2, true);
-    /* block align (channel count * bytes per sample) */
-    view.setUint16(32, numOfChan * 2, true);
-    /* bits per sample */
-    view.setUint16(34, 16, true);
-    /* data chunk identifier */
-    writeString(view, 36, 'data');
-    /* data chunk length */
-    view.setUint32(40, dataLength, true);
-
-    floatTo16BitPCM(view, 44, samples);
-
-    return new Blob([view], { type: 'audio/wav' });
-}
-
-function writeString(view, offset, string) {
-    for (let i = 0; i < string.length; i++) {
-        view.setUint8(offset + i, string.charCodeAt(i));
-    }
-}
-
-function floatTo16BitPCM(output, offset, input) {
-    for (let i = 0; i < input.length; i++, offset += 2) {
-        const s = Math.max(-1, Math.min(1, input[i]));
-        output.setInt16(offset, s < 0 ? s * 0x8000 : s * 0x7FFF, true);
-    }
+function showDecodedMessage(text, mode) {
+    decodeOutput.innerHTML = `<span class="status-success">Decoded Message:</span><br>`;
+    decodeOutput.appendChild(document.createTextNode(text));
+    decodedModeDisplay.textContent = mode ? `(Mode: ${mode})` : '';
+    copyDecodedBtn.style.display = 'block';
 }
 
 async function decodeBlob(blob, fileName = '') {
@@ -168,6 +127,7 @@ async function decodeBlob(blob, fileName = '') {
         const formData = new FormData();
         // The backend expects a file with a name.
         formData.append("file", blob, "live_recording.wav");
+        formData.append("mode", modeSelect.value);
 
         const res = await fetch(`${API_BASE}/decode_signal`, {
             method: "POST",
@@ -181,13 +141,7 @@ async function decodeBlob(blob, fileName = '') {
 
         const data = await res.json();
         if (data.decoded_text) {
-            decodeOutput.innerHTML = `<span class="status-success">Decoded Message:</span><br>${data.decoded_text}`;
-            if (data.detected_mode) {
-                decodedModeDisplay.textContent = `(Mode: ${data.detected_mode})`;
-            } else {
-                decodedModeDisplay.textContent = '';
-            }
-            copyDecodedBtn.style.display = 'block';
+            showDecodedMessage(data.decoded_text, data.detected_mode);
         } else {
             decodeOutput.innerHTML = `<span class="status-error">No message decoded.</span>`;
             decodedModeDisplay.textContent = '';
@@ -211,57 +165,106 @@ decodeBtn.onclick = async () => {
     decodeBlob(file, file.name);
 };
 
-// Live Recording Logic
+// Live Decoding Logic
+// Microphone samples are streamed to /ws/decode while they are captured, and
+// the server pushes every decoded packet back, so text appears as it arrives.
+function handleDecodeEvent(event, session) {
+    if (event.event === 'packet_decoded') {
+        if (event.total_packets !== session.totalPackets) {
+            // A new message has started
+            session.packetTexts = {};
+            session.totalPackets = event.total_packets;
+        }
+        session.packetTexts[event.packet_num] = event.text;
+        const received = Object.keys(session.packetTexts)
+            .sort((a, b) => a - b)
+            .map(num => session.packetTexts[num]);
+        recordStatus.textContent = `Listening... received packet ${event.packet_num} of ${event.total_packets} (${event.mode})`;
+        decodeOutput.textContent = received.join('');
+    } else if (event.event === 'crc_failure') {
+        recordStatus.textContent = 'Listening... a damaged packet was skipped';
+    } else if (event.event === 'message_complete') {
+        session.packetTexts = {};
+        session.totalPackets = 0;
+        showDecodedMessage(event.decoded_text, event.detected_mode);
+        recordStatus.textContent = 'Listening...';
+    }
+}
+
+function stopLiveDecoding() {
+    if (!liveSession) {
+        return;
+    }
+    const { stream, audioContext, socket } = liveSession;
+    liveSession = null;
+    stream.getTracks().forEach(track => track.stop());
+    audioContext.close();
+    socket.close();
+    recordBtn.style.display = 'inline-block';
+    stopBtn.style.display = 'none';
+    recordStatus.textContent = "";
+}
+
 recordBtn.onclick = async () => {
     try {
-        const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
-        mediaRecorder = new MediaRecorder(stream);
-
-        mediaRecorder.ondataavailable = event => {
-            audioChunks.push(event.data);
+        // Browser voice processing distorts the modem tones
+        const stream = await navigator.mediaDevices.getUserMedia({
+            audio: { echoCancellation: false, noiseSuppression: false, autoGainControl: false }
+        });
+        const audioContext = new AudioContext({ sampleRate: SAMPLE_RATE });
+        await audioContext.audioWorklet.addModule('pcm-worklet.js');
+        const source = audioContext.createMediaStreamSource(stream);
+        const capture = new AudioWorkletNode(audioContext, 'pcm-capture');
+        const socket = new WebSocket(`${WS_BASE}/ws/decode?mode=${modeSelect.value}`);
+        const session = { stream, audioContext, socket, packetTexts: {}, totalPackets: 0 };
+        liveSession = session;
+
+        let pending = [];
+        let pendingLength = 0;
+        capture.port.onmessage = ({ data }) => {
+            pending.push(data);
+            pendingLength += data.length;
+            if (pendingLength >= FRAME_SAMPLES && socket.readyState === WebSocket.OPEN) {
+                const frame = new Float32Array(pendingLength);
+                let offset = 0;
+                for (const chunk of pending) {
+                    frame.set(chunk, offset);
+                    offset += chunk.length;
+                }
+                socket.send(frame.buffer);
+                pending = [];
+                pendingLength = 0;
+            }
         };
-
-        mediaRecorder.onstop = async () => {
-            const audioBlob = new Blob(audioChunks);
-            const audioContext = new (window.AudioContext || window.webkitAudioContext)();
-
-            try {
-                const arrayBuffer = await audioBlob.arrayBuffer();
-                const audioBuffer = await audioContext.decodeAudioData(arrayBuffer);
-                const wavBlob = encodeWAV(audioBuffer);
-                decodeBlob(wavBlob, 'live_recording.wav');
-            } catch (e) {
-                console.error("Error decoding audio data:", e);
-                recordStatus.textContent = `Error processing audio: ${e.message}`;
-            } finally {
-                // Clean up
-                audioChunks = [];
-                stream.getTracks().forEach(track => track.stop());
+        // Only capture once the server is ready to receive
+        socket.onopen = () => source.connect(capture);
+        socket.onmessage = ({ data }) => handleDecodeEvent(JSON.parse(data), session);
+        socket.onclose = ({ code, reason }) => {
+            if (liveSession === session) {
+                stopLiveDecoding();
+                if (code !== 1000) {
+                    recordStatus.textContent = `Connection closed: ${reason || code}`;
+                }
             }
         };
 
-        // UI updates for recording state
+        // UI updates for listening state
         recordBtn.style.display = 'none';
         stopBtn.style.display = 'inline-block';
-        recordStatus.textContent = "Recording...";
+        recordStatus.textContent = "Listening...";
         decodeOutput.textContent = ""; // Clear previous output
-
-        mediaRecorder.start();
+        decodedModeDisplay.textContent = '';
+        copyDecodedBtn.style.display = 'none';
 
     } catch (err) {
+        stopLiveDecoding();
         recordStatus.textContent = `Error: ${err.message}`;
         console.error("Error accessing microphone:", err);
     }
 };
 
 stopBtn.onclick = () => {
-    if (mediaRecorder && mediaRecorder.state === 'recording') {
-        mediaRecorder.stop();
-        // UI updates
-        recordBtn.style.display = 'inline-block';
-        stopBtn.style.display = 'none';
-        recordStatus.textContent = "";
-    }
+    stopLiveDecoding();
 };
 
 // Copy decoded text to clipboard